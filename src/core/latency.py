@@ -0,0 +1,117 @@
+"""
+Latency statistics module
+Bounded-memory latency histograms (HDR-style log-linear buckets) and
+per-host loss/jitter tracking for the continuous latency monitor
+"""
+
+from array import array
+from collections import namedtuple
+
+# Each power-of-two range of microseconds is split into 2**SUB_BUCKET_BITS
+# linear sub-buckets: values are kept within ~3% whatever their magnitude
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_VALUE_US = 60_000_000  # larger samples are clamped to 60 s
+
+def _bucket_index(value):
+    """Bucket of a value in microseconds"""
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return SUB_BUCKETS + shift * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+def _bucket_value(index):
+    """Representative (middle) value in microseconds of a bucket"""
+    if index < SUB_BUCKETS:
+        return index
+    shift, offset = divmod(index - SUB_BUCKETS, SUB_BUCKETS)
+    return ((SUB_BUCKETS + offset) << shift) + ((1 << shift) >> 1)
+
+_BUCKET_COUNT = _bucket_index(MAX_VALUE_US) + 1
+
+class LatencyHistogram:
+    """
+    Latency histogram over fixed log-linear buckets.
+    Memory is constant (a few KB) whatever the number of samples;
+    percentiles are exact to about 3%.
+    """
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * _BUCKET_COUNT))
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        """Add one latency sample, in seconds"""
+        value = min(MAX_VALUE_US, max(0, int(seconds * 1_000_000)))
+        self.counts[_bucket_index(value)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, percent):
+        """Latency in seconds below which `percent` % of samples fall, or None"""
+        if not self.count:
+            return None
+        rank = max(1, round(self.count * percent / 100))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                value = _bucket_value(index) / 1_000_000
+                # The bucket middle may lie outside the observed range
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def reset(self):
+        self.counts = array("Q", bytes(8 * _BUCKET_COUNT))
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+# Latency summary of one host; times in seconds (None before any reply),
+# loss in percent
+LatencySnapshot = namedtuple(
+    "LatencySnapshot",
+    "host sent received loss last min p50 p95 p99 max jitter")
+
+class HostLatency:
+    """
+    Latency, jitter and loss of one monitored host.
+    Jitter is the RFC 3550 interarrival jitter: a running average of
+    the difference between consecutive round-trip times.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.histogram = LatencyHistogram()
+        self.sent = 0
+        self.received = 0
+        self.last = None
+        self.jitter = 0.0
+
+    def record(self, rtt):
+        """Record one probe: its RTT in seconds, or None if it was lost"""
+        self.sent += 1
+        if rtt is None:
+            return
+        if self.last is not None:
+            self.jitter += (abs(rtt - self.last) - self.jitter) / 16
+        self.received += 1
+        self.last = rtt
+        self.histogram.record(rtt)
+
+    def snapshot(self):
+        histogram = self.histogram
+        loss = (self.sent - self.received) / self.sent * 100 if self.sent else 0.0
+        return LatencySnapshot(self.host, self.sent, self.received, loss, self.last,
+                               histogram.min, histogram.percentile(50), histogram.percentile(95),
+                               histogram.percentile(99), histogram.max,
+                               self.jitter if self.received > 1 else None)
@@ -0,0 +1,145 @@
+"""
+Probe order permutation module
+Walks the (host, port) probe space in a seeded pseudo-random order with
+O(1) memory, using a Feistel cipher over the index range with cycle
+walking (the approach of masscan's BlackRock)
+"""
+
+import math
+import random
+
+_MASK64 = (1 << 64) - 1
+
+def _isqrt(n):
+    """Integer square root (math.isqrt needs Python 3.8)"""
+    root = int(math.sqrt(n))
+    # Float rounding may be one off for large n
+    while root * root > n:
+        root -= 1
+    while (root + 1) * (root + 1) <= n:
+        root += 1
+    return root
+
+class Permutation:
+    """
+    Seeded bijection of range(size) onto itself.
+    The index is split into two digits of bases a and b (a * b >= size)
+    that are mixed by a few Feistel rounds; results outside the range
+    are re-encrypted until they fall inside it (cycle walking).
+    The same size and seed always give the same order, so a position
+    in the order can be used to resume or shard a scan.
+    """
+
+    def __init__(self, size, seed=0, rounds=4):
+        self.size = size
+        self.seed = seed
+        self.rounds = rounds
+        self.a = max(1, _isqrt(max(0, size - 1)))
+        self.b = self.a + 1
+        while self.a * self.b < size:
+            self.b += 1
+        rng = random.Random(seed)
+        self._keys = [rng.getrandbits(64) for _ in range(rounds)]
+
+    def _round(self, j, value):
+        # Cheap 64-bit mixing function (splitmix64 finaliser)
+        x = (value ^ self._keys[j]) & _MASK64
+        x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+        x = (x ^ (x >> 27)) * 0x94D049BB133111EB & _MASK64
+        return x ^ (x >> 31)
+
+    def _encrypt(self, m):
+        a, b = self.a, self.b
+        left, right = m % a, m // a
+        for j in range(self.rounds):
+            modulus = a if j & 1 == 0 else b
+            left, right = right, (left + self._round(j, right)) % modulus
+        if self.rounds & 1:
+            return a * left + right
+        return a * right + left
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        """Index of the probe visited at position `index`"""
+        if not 0 <= index < self.size:
+            raise IndexError("Position hors limites")
+        value = self._encrypt(index)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+    def iter_range(self, start=0, stop=None):
+        """Yield the permuted indexes for positions start..stop-1"""
+        stop = self.size if stop is None else min(stop, self.size)
+        for position in range(start, stop):
+            yield self[position]
+
+    def __iter__(self):
+        return self.iter_range()
+
+class ProbeSpace:
+    """
+    The (host, port) probe matrix addressed by a single position.
+    Without a seed positions follow host-then-port order; with a seed
+    they follow a Permutation of the matrix, spreading consecutive
+    probes over every host and port. Hosts and ports only need len()
+    and indexing (lists, TargetSpec, ...).
+    """
+
+    def __init__(self, hosts, ports, seed=None):
+        self.hosts = hosts
+        self.ports = ports
+        self.seed = seed
+        self.size = len(hosts) * len(ports)
+        self.permutation = None if seed is None else Permutation(self.size, seed)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, position):
+        """(host, port) probed at a position of the order"""
+        index = position if self.permutation is None else self.permutation[position]
+        host_index, port_index = divmod(index, len(self.ports))
+        return self.hosts[host_index], self.ports[port_index]
+
+    def iter_range(self, start=0, stop=None):
+        """Yield (position, host, port) for positions start..stop-1"""
+        stop = self.size if stop is None else min(stop, self.size)
+        for position in range(start, stop):
+            host, port = self[position]
+            yield position, host, port
+
+    def __iter__(self):
+        return self.iter_range()
+
+def shuffled(items, seed=0, start=0):
+    """
+    Yield the items of a sequence in a seeded pseudo-random order,
+    skipping the first `start` positions of that order.
+    """
+    permutation = Permutation(len(items), seed)
+    for index in permutation.iter_range(start):
+        yield items[index]
+
+class CompletionCursor:
+    """
+    Resume point of a scan whose probes complete out of order.
+    `position` is the first position of the probe order that has not
+    completed yet: every probe before it is done, so a resumed scan
+    restarts there and re-probes at most the ones that were in flight.
+    """
+
+    def __init__(self, start=0):
+        self.position = start
+        self._done = set()  # completed positions beyond self.position
+
+    def complete(self, position):
+        """Mark one position of the probe order as completed"""
+        if position < self.position:
+            return
+        self._done.add(position)
+        while self.position in self._done:
+            self._done.remove(self.position)
+            self.position += 1
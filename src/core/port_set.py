@@ -0,0 +1,195 @@
+"""
+Compact port set module
+A set of TCP/UDP ports stored as a 65536-bit bitmap (8 KB whatever the
+number of ports) and a parser for mixed port specifications
+"""
+
+import re
+
+PORT_MIN = 1
+PORT_MAX = 65535
+BITMAP_SIZE = 65536 // 8
+
+# Named port groups usable in port specifications
+PORT_GROUPS = {
+    "web": [80, 443, 591, 8000, 8008, 8080, 8443, 8888],
+    "db": [1433, 1521, 3306, 5432, 6379, 9042, 9200, 11211, 27017],
+    "mail": [25, 110, 143, 465, 587, 993, 995],
+    "remote": [22, 23, 3389, 5900, 5985, 5986],
+    "file": [20, 21, 69, 139, 445, 873, 2049],
+    "top": [21, 22, 23, 25, 53, 80, 110, 111, 135, 139, 143, 443, 445, 993, 995,
+            1433, 1723, 3306, 3389, 5432, 5900, 6379, 8080, 8443, 27017],
+    "all": [(PORT_MIN, PORT_MAX)],
+}
+
+class PortSet:
+    """
+    Set of ports backed by a 65536-bit bitmap.
+    Bit N of byte N // 8 is set when port N is in the set. The bitmap
+    can wrap any writable buffer (e.g. shared memory) without copying.
+    """
+
+    def __init__(self, ports=(), buffer=None):
+        if buffer is None:
+            self._bits = bytearray(BITMAP_SIZE)
+        else:
+            if len(buffer) != BITMAP_SIZE:
+                raise ValueError(f"Port bitmap must be {BITMAP_SIZE} bytes")
+            self._bits = memoryview(buffer).cast("B")
+        for port in ports:
+            self.add(port)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        """Wrap an existing 8 KB bitmap buffer (zero-copy)"""
+        return cls(buffer=buffer)
+
+    @classmethod
+    def from_range(cls, start, end):
+        """Build a set holding every port from start to end inclusive"""
+        port_set = cls()
+        port_set.add_range(start, end)
+        return port_set
+
+    def to_bytes(self):
+        """Raw bitmap, e.g. to hand over to worker processes"""
+        return bytes(self._bits)
+
+    def _as_int(self):
+        return int.from_bytes(self._bits, "little")
+
+    @classmethod
+    def _from_int(cls, value):
+        return cls(buffer=bytearray(value.to_bytes(BITMAP_SIZE, "little")))
+
+    def add(self, port):
+        """Add one port"""
+        _check_port(port)
+        self._bits[port >> 3] |= 1 << (port & 7)
+
+    def discard(self, port):
+        """Remove one port if present"""
+        _check_port(port)
+        self._bits[port >> 3] &= ~(1 << (port & 7)) & 0xFF
+
+    def add_range(self, start, end):
+        """Add every port from start to end inclusive"""
+        if start > end:
+            start, end = end, start
+        _check_port(start)
+        _check_port(end)
+        # Whole bytes are filled in one slice assignment
+        first_full = (start + 7) >> 3
+        last_full = (end + 1) >> 3
+        if first_full >= last_full:
+            for port in range(start, end + 1):
+                self.add(port)
+            return
+        for port in range(start, first_full << 3):
+            self.add(port)
+        self._bits[first_full:last_full] = b"\xff" * (last_full - first_full)
+        for port in range(last_full << 3, end + 1):
+            self.add(port)
+
+    def __contains__(self, port):
+        return 0 <= port <= PORT_MAX and bool(self._bits[port >> 3] >> (port & 7) & 1)
+
+    def __len__(self):
+        return bin(self._as_int()).count("1")
+
+    def __bool__(self):
+        return any(self._bits)
+
+    def __iter__(self):
+        """Iterate ports in ascending order"""
+        for index, byte in enumerate(self._bits):
+            if byte:
+                base = index << 3
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield base + bit
+
+    def __eq__(self, other):
+        if not isinstance(other, PortSet):
+            return NotImplemented
+        return self._bits == other._bits
+
+    def __or__(self, other):
+        return PortSet._from_int(self._as_int() | other._as_int())
+
+    def __and__(self, other):
+        return PortSet._from_int(self._as_int() & other._as_int())
+
+    def __sub__(self, other):
+        return PortSet._from_int(self._as_int() & ~other._as_int())
+
+    def __ior__(self, other):
+        self._bits[:] = (self._as_int() | other._as_int()).to_bytes(BITMAP_SIZE, "little")
+        return self
+
+    def __isub__(self, other):
+        self._bits[:] = (self._as_int() & ~other._as_int()).to_bytes(BITMAP_SIZE, "little")
+        return self
+
+    def copy(self):
+        return PortSet(buffer=bytearray(self._bits))
+
+    def ranges(self):
+        """Yield (start, end) runs of consecutive ports"""
+        start = previous = None
+        for port in self:
+            if start is None:
+                start = previous = port
+            elif port == previous + 1:
+                previous = port
+            else:
+                yield start, previous
+                start = previous = port
+        if start is not None:
+            yield start, previous
+
+    def to_spec(self):
+        """Compact specification string, e.g. '22,80,8000-9000'"""
+        return ",".join(str(start) if start == end else f"{start}-{end}"
+                        for start, end in self.ranges())
+
+    def __repr__(self):
+        return f"PortSet('{self.to_spec()}')"
+
+def _check_port(port):
+    if not PORT_MIN <= port <= PORT_MAX:
+        raise ValueError(f"Port hors limites: {port}")
+
+def _parse_token(token):
+    """Parse one spec token (port, range or group name) into a PortSet"""
+    name = token.lower()
+    if name in PORT_GROUPS:
+        port_set = PortSet()
+        for entry in PORT_GROUPS[name]:
+            if isinstance(entry, tuple):
+                port_set.add_range(*entry)
+            else:
+                port_set.add(entry)
+        return port_set
+    if "-" in token:
+        start, end = token.split("-", 1)
+        return PortSet.from_range(int(start.strip()), int(end.strip()))
+    return PortSet([int(token)])
+
+def parse_port_spec(text):
+    """
+    Parse a port specification into a PortSet.
+    Accepts comma/space separated ports, ranges and group names, and
+    exclusions prefixed with '!', e.g. '22,80,8000-9000,web,!8080'.
+    Raises ValueError on invalid input.
+    """
+    included = PortSet()
+    excluded = PortSet()
+    text = re.sub(r"\s*-\s*", "-", text)
+    for token in text.replace(",", " ").split():
+        if token.startswith("!"):
+            excluded |= _parse_token(token[1:])
+        else:
+            included |= _parse_token(token)
+    included -= excluded
+    return included
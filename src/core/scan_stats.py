@@ -0,0 +1,59 @@
+"""
+Scan statistics module
+Live counters of a running scan, bumped by the scan engines on their hot
+path (plain attribute increments) and turned into rates, percentiles
+and an ETA only when the GUI asks for a snapshot
+"""
+
+import time
+from collections import namedtuple
+
+from src.core.latency import LatencyHistogram
+
+# Rates in probes per second, latencies in seconds, eta in seconds
+# (None while unknown), timeout/error rates in percent
+ScanStatsSnapshot = namedtuple(
+    "ScanStatsSnapshot",
+    "completed total in_flight window rate p50 p99 timeout_rate error_rate elapsed eta")
+
+class ScanStats:
+    """
+    Counters of one scan.
+    The engine thread is the only writer of the counters and the
+    snapshot() caller the only writer of the rate average, so no lock
+    is taken on either side.
+    """
+    RATE_GAIN = 0.3  # EWMA gain of the completion rate, per snapshot
+
+    def __init__(self, total=None):
+        self.total = total
+        self.sent = 0        # probes sent, retransmissions and retries included
+        self.completed = 0   # probes with a final state
+        self.timeouts = 0    # probes (or transmissions) that got no answer in time
+        self.errors = 0      # local or network errors (ENOBUFS, unreachable...)
+        self.in_flight = 0
+        self.window = 0      # in-flight limit the engine currently applies
+        self.latency = LatencyHistogram()
+        self.started = time.monotonic()
+        self._last_time = self.started
+        self._last_completed = 0
+        self._rate = None
+
+    def snapshot(self):
+        """Current ScanStatsSnapshot, updating the moving-average rate"""
+        now = time.monotonic()
+        completed = self.completed
+        interval = now - self._last_time
+        if interval > 0:
+            instant = (completed - self._last_completed) / interval
+            self._rate = instant if self._rate is None else self._rate + self.RATE_GAIN * (instant - self._rate)
+            self._last_time = now
+            self._last_completed = completed
+        eta = None
+        if self.total is not None and self._rate:
+            eta = max(0, self.total - completed) / self._rate
+        timeout_rate = self.timeouts / self.sent * 100 if self.sent else 0.0
+        error_rate = self.errors / self.sent * 100 if self.sent else 0.0
+        return ScanStatsSnapshot(completed, self.total, self.in_flight, self.window, self._rate or 0.0,
+                                 self.latency.percentile(50), self.latency.percentile(99),
+                                 timeout_rate, error_rate, now - self.started, eta)
@@ -8,21 +8,1348 @@ import platform
 import requests
 import subprocess
 import time
+import asyncio
+import errno
+import selectors
+import os
+import heapq
+import itertools
+import threading
+import ipaddress
+import random
+import struct
+from collections import deque, OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, Future, wait as wait_futures, FIRST_COMPLETED
+import multiprocessing
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows has no RLIMIT_NOFILE
+    resource = None
+
+from src.core.permutation import ProbeSpace
+from src.core.service_probes import get_service_database, match_service, format_service_match
+from src.core.service_registry import service_name
+from src.core.latency import HostLatency
+from src.core.scan_stats import ScanStats
+
+class DnsCache:
+    """
+    Thread-safe LRU cache of hostname -> IPv4 address resolutions.
+    The system resolver does not expose record TTLs, so entries live
+    for a fixed `ttl` (failures for `negative_ttl`) and at most
+    `max_entries` hostnames are kept.
+    """
+
+    def __init__(self, max_entries=4096, ttl=300.0, negative_ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # host -> (expiry, address, error)
+        self._lock = threading.Lock()
+
+    def resolve(self, host):
+        """
+        Return the IPv4 address of host, from cache when still fresh.
+        Raises socket.gaierror if the host cannot be resolved.
+        """
+        try:
+            return str(ipaddress.IPv4Address(host))
+        except ValueError:
+            pass
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(host)
+                _, address, error = entry
+                if error is not None:
+                    raise socket.gaierror(*error)
+                return address
+
+        try:
+            infos = socket.getaddrinfo(host, None, socket.AF_INET, socket.SOCK_STREAM)
+            address, error = infos[0][4][0], None
+        except socket.gaierror as e:
+            address, error = None, (e.errno, e.strerror)
+
+        with self._lock:
+            ttl = self.ttl if error is None else self.negative_ttl
+            self._entries[host] = (time.monotonic() + ttl, address, error)
+            self._entries.move_to_end(host)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        if error is not None:
+            raise socket.gaierror(*error)
+        return address
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Resolver cache shared by every scan and lookup
+dns_cache = DnsCache()
+
+def resolve_host(host):
+    """Resolve a hostname to an IPv4 address through the shared cache"""
+    return dns_cache.resolve(host)
+
+# connect_ex() codes meaning the target answered (SYN/ACK or RST)
+_CONNECT_ANSWERED = {0, errno.ECONNREFUSED, getattr(errno, "WSAECONNREFUSED", errno.ECONNREFUSED)}
+
+class RttEstimator:
+    """
+    Smoothed connect RTT estimate for one target, RFC 6298 style.
+    Probe timeouts are derived from it instead of a fixed preset, so
+    LAN hosts get tight timeouts and slow links are given more time.
+    """
+    ALPHA = 0.125  # gain of the smoothed RTT
+    BETA = 0.25    # gain of the RTT variance
+    K = 4          # variance multiplier in the timeout
+
+    def __init__(self, initial_timeout=1.0, min_timeout=0.05, max_timeout=3.0):
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.srtt = None
+        self.rttvar = None
+        self._lock = threading.Lock()
+
+    def sample(self, rtt):
+        """Feed one measured connect RTT (SYN/ACK or RST) in seconds"""
+        with self._lock:
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2
+            else:
+                self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+                self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+
+    def timeout(self):
+        """Current probe timeout in seconds"""
+        if self.srtt is None:
+            return self.initial_timeout
+        rto = self.srtt + self.K * self.rttvar
+        return min(self.max_timeout, max(self.min_timeout, rto))
+
+class TargetStateCache:
+    """
+    Thread-safe LRU map of target address -> per-target state object
+    (created by `factory` on first use). At most `max_entries` addresses
+    are kept, so sweeping large ranges runs in bounded memory; an
+    evicted target simply starts over from a fresh state.
+    """
+
+    def __init__(self, factory, max_entries=4096):
+        self.factory = factory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, address):
+        with self._lock:
+            state = self._entries.get(address)
+            if state is None:
+                state = self._entries[address] = self.factory()
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(address)
+            return state
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_rtt_estimators = TargetStateCache(RttEstimator)
+
+def get_rtt_estimator(address):
+    """Get the shared RttEstimator of a resolved target address"""
+    return _rtt_estimators.get(address)
+
+# Local errors meaning the scanner itself is sending too fast
+_LOCAL_PRESSURE_ERRORS = {
+    errno.ENOBUFS, errno.EAGAIN, errno.EMFILE, errno.ENFILE, errno.EADDRNOTAVAIL,
+    getattr(errno, "WSAENOBUFS", errno.ENOBUFS),
+}
+
+class AimdController:
+    """
+    AIMD congestion control of the number of in-flight probes for one
+    target: the window grows by about one probe per window of clean
+    outcomes and is halved when timeouts spike above their usual rate
+    or when the local stack reports ENOBUFS/EAGAIN-like errors.
+    Timeouts at the baseline rate count as clean outcomes, so a filtered
+    target (nothing ever answers) still opens the window. Until the
+    first decrease the window grows by one probe per clean outcome
+    (slow start), as it does from a fresh TCP connection.
+    """
+    FAST_GAIN = 0.1    # EWMA gain of the recent timeout rate
+    SLOW_GAIN = 0.01   # EWMA gain of the baseline timeout rate
+    SPIKE = 0.2        # recent - baseline rate that counts as a spike
+    WARMUP = 32        # outcomes seen before spikes are judged
+
+    def __init__(self, initial=64, minimum=8, maximum=5000, decrease=0.5):
+        self.window = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self._recent_rate = 0.0
+        self._baseline_rate = 0.0
+        self._outcomes = 0
+        self._since_decrease = 0
+        self._slow_start = True
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self):
+        """Number of probes allowed in flight right now"""
+        return int(self.window)
+
+    def _record(self, timed_out):
+        self._outcomes += 1
+        self._since_decrease += 1
+        value = 1.0 if timed_out else 0.0
+        if self._outcomes <= self.WARMUP:
+            # Warm-up: both averages follow the plain mean
+            self._recent_rate += (value - self._recent_rate) / self._outcomes
+            self._baseline_rate = self._recent_rate
+        else:
+            self._recent_rate += self.FAST_GAIN * (value - self._recent_rate)
+            self._baseline_rate += self.SLOW_GAIN * (value - self._baseline_rate)
+
+    def _shrink(self):
+        # At most one decrease per window of outcomes, like TCP per RTT
+        if self._since_decrease < self.limit:
+            return
+        self.window = max(self.minimum, self.window * self.decrease)
+        self._since_decrease = 0
+        self._slow_start = False
+
+    def _grow(self):
+        step = 1.0 if self._slow_start else 1.0 / self.window
+        self.window = min(self.maximum, self.window + step)
+
+    def on_success(self):
+        """The target answered (SYN/ACK or RST)"""
+        with self._lock:
+            self._record(False)
+            self._grow()
+
+    def on_timeout(self):
+        """A probe got no answer before its timeout"""
+        with self._lock:
+            self._record(True)
+            if self._outcomes > self.WARMUP and self._recent_rate - self._baseline_rate > self.SPIKE:
+                self._shrink()
+            else:
+                self._grow()
+
+    def on_error(self, err):
+        """A probe failed locally with the given errno"""
+        if err in _LOCAL_PRESSURE_ERRORS:
+            with self._lock:
+                self._since_decrease = max(self._since_decrease, self.limit)
+                self._shrink()
+
+_congestion_controllers = TargetStateCache(AimdController)
+
+def get_congestion_controller(address):
+    """Get the shared AimdController of a resolved target address"""
+    return _congestion_controllers.get(address)
+
+def _count_open_fds():
+    """Number of descriptors currently open by this process (Linux only)"""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return 0
+
+def raise_nofile_limit(wanted=1048576):
+    """
+    Raise the soft RLIMIT_NOFILE as close to `wanted` as the hard limit
+    allows. Returns the resulting soft limit, or None where there is no
+    such limit (Windows).
+    """
+    if resource is None:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY:
+        wanted = min(wanted, hard)
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        # macOS refuses values above OPEN_MAX even with an infinite hard limit
+        for candidate in (wanted, min(wanted, 10240)):
+            try:
+                resource.setrlimit(resource.RLIMIT_NOFILE, (candidate, hard))
+                soft = candidate
+                break
+            except (ValueError, OSError):
+                continue
+    return soft
+
+class FdBudget:
+    """
+    Socket slots handed out within the process file-descriptor limit,
+    so concurrent engines wait for a free slot instead of failing with
+    EMFILE. Headroom is kept for SQLite, the GUI, log files and stdio.
+    """
+    RESERVED = 64             # descriptors never handed out to sockets
+    DEFAULT_CAPACITY = 8192   # when the platform has no RLIMIT_NOFILE
+
+    def __init__(self, capacity=None):
+        if capacity is None:
+            soft = raise_nofile_limit()
+            if soft is None or soft == resource.RLIM_INFINITY:
+                capacity = self.DEFAULT_CAPACITY
+            else:
+                capacity = soft - self.RESERVED - _count_open_fds()
+        self.capacity = max(1, capacity)
+        self.in_use = 0
+        self._cond = threading.Condition()
+
+    def try_acquire(self):
+        """Take one slot if one is free, without waiting"""
+        with self._cond:
+            if self.in_use >= self.capacity:
+                return False
+            self.in_use += 1
+            return True
+
+    def acquire(self, timeout=None):
+        """Wait for a free slot; returns False if timeout expired first"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.in_use < self.capacity, timeout):
+                return False
+            self.in_use += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self.in_use -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        """Hold one slot for the duration of a with block"""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+_fd_budget = None
+_fd_budget_lock = threading.Lock()
+
+def get_fd_budget():
+    """
+    Get the process-wide FdBudget, raising RLIMIT_NOFILE the first
+    time it is called.
+    """
+    global _fd_budget
+    with _fd_budget_lock:
+        if _fd_budget is None:
+            _fd_budget = FdBudget()
+        return _fd_budget
+
+class TokenBucket:
+    """
+    Token bucket limiting the probe send rate (probes per second).
+    Engines take tokens in batches, one lock round-trip per batch of
+    probes rather than per probe. A rate of None means unlimited.
+    """
+
+    def __init__(self, rate=None, burst=None):
+        self._lock = threading.Lock()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate, burst=None):
+        """Change the rate; the burst defaults to 50 ms worth of tokens"""
+        with self._lock:
+            self.rate = rate
+            self.burst = burst or (max(1.0, rate / 20) if rate else 0.0)
+            self._tokens = self.burst
+            self._stamp = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def take(self, wanted):
+        """Take up to `wanted` tokens without waiting; returns how many"""
+        if self.rate is None or wanted <= 0:
+            return max(0, wanted)
+        with self._lock:
+            self._refill()
+            granted = min(wanted, int(self._tokens))
+            self._tokens -= granted
+            return granted
+
+    def refund(self, count):
+        """Give back tokens taken but not used"""
+        if self.rate is None or count <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + count)
+
+    def wait_time(self):
+        """Seconds until one token is available (0 if one already is)"""
+        if self.rate is None:
+            return 0.0
+        with self._lock:
+            self._refill()
+            return max(0.0, (1 - self._tokens) / self.rate)
+
+    def acquire(self):
+        """Wait for and take one token"""
+        while not self.take(1):
+            time.sleep(self.wait_time())
+
+# Send-rate limiter shared by every scan engine of the process
+rate_limiter = TokenBucket()
+
+def set_max_rate(rate):
+    """Limit all scans of this process to `rate` probes/s (None = unlimited)"""
+    rate_limiter.set_rate(rate)
+
+class CancelToken:
+    """
+    Cooperative cancellation of running scans, triggered from any thread.
+    Engines check `cancelled` between steps and register a callback to
+    be woken at once from a blocking wait, then drop their in-flight
+    probes and close their sockets.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback):
+        """Call `callback` on cancellation (at once if already cancelled)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def wait(self, timeout=None):
+        """Sleep up to `timeout` seconds; returns True if cancelled"""
+        return self._event.wait(timeout)
+
+def _cancel_future(loop, cancel):
+    """
+    Future of the running loop resolved when `cancel` fires, to be
+    added to the awaitables of an asyncio.wait().
+    Returns (future, release); call release() once done waiting.
+    """
+    future = loop.create_future()
+
+    def wake():
+        def resolve():
+            if not future.done():
+                future.set_result(None)
+        try:
+            loop.call_soon_threadsafe(resolve)
+        except RuntimeError:
+            pass  # loop already closed
+
+    cancel.add_callback(wake)
+    return future, lambda: cancel.remove_callback(wake)
+
+@contextmanager
+def _cancel_waker(selector, cancel):
+    """
+    Socket registered on `selector` that becomes readable when `cancel`
+    fires, so that a blocking select() returns at once. Yields the
+    socket, to tell its events from those of the probes.
+    """
+    reader, writer = socket.socketpair()
+
+    def wake():
+        try:
+            writer.send(b"\0")
+        except OSError:
+            pass
+
+    reader.setblocking(False)
+    selector.register(reader, selectors.EVENT_READ)
+    cancel.add_callback(wake)
+    try:
+        yield reader
+    finally:
+        cancel.remove_callback(wake)
+        selector.unregister(reader)
+        reader.close()
+        writer.close()
+
+def _select_timeout(deadline, more_work):
+    """
+    Seconds a selector loop may block until `deadline` (0.01 if None),
+    shortened when the rate limiter is what holds probes back.
+    """
+    wait = 0.01 if deadline is None else max(0.0, deadline - time.monotonic())
+    if more_work:
+        wait = min(wait, rate_limiter.wait_time() or wait)
+    return wait
 
 def port_scan(target, port, timeout=0.5):
     """
     Scan a single port on the target.
+    A timeout of None derives it from the target's measured RTT.
     Returns True if port is open, False otherwise.
     """
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-        result = sock.connect_ex((target, port))
-        sock.close()
+        address = resolve_host(target)
+        rtt = get_rtt_estimator(address)
+        rate_limiter.acquire()
+        with get_fd_budget().slot():
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.settimeout(rtt.timeout() if timeout is None else timeout)
+            started = time.monotonic()
+            result = sock.connect_ex((address, port))
+            if result in _CONNECT_ANSWERED:
+                rtt.sample(time.monotonic() - started)
+            sock.close()
         return result == 0
     except Exception as e:
         return False
 
+# One probe result: state is "open", "closed" (RST) or "filtered"
+# (no answer or unreachable); rtt in seconds is None when nothing
+# answered; service is only set for open ports and banner only when
+# banner grabbing is enabled and the service answered (probe is the
+# name of the signature-database probe the banner answers)
+ScanEvent = namedtuple("ScanEvent", "host port state rtt service banner probe", defaults=(None, None))
+
+def _make_event(host, port, state, rtt=None, banner=None, probe=None, protocol="tcp"):
+    service = detect_service(port, banner, probe or "NULL", protocol) if state == "open" else None
+    return ScanEvent(host, port, state, rtt, service, banner, probe)
+
+async def _probe_port_async(loop, address, port, timeout, rtt, aimd, stats, keep_open=False):
+    """
+    Attempt one non-blocking TCP connect on the running event loop.
+    Returns (port, state, rtt, sock), with state None when the probe
+    failed locally and must be retried. With keep_open the connected
+    socket of an open port is returned instead of closed.
+    """
+    sock = None
+    started = time.monotonic()
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        await asyncio.wait_for(loop.sock_connect(sock, (address, port)), timeout)
+        elapsed = time.monotonic() - started
+        rtt.sample(elapsed)
+        aimd.on_success()
+        stats.latency.record(elapsed)
+        if keep_open:
+            connected, sock = sock, None
+            return port, "open", elapsed, connected
+        return port, "open", elapsed, None
+    except ConnectionRefusedError:
+        # A RST measures the round trip just as well as a SYN/ACK
+        elapsed = time.monotonic() - started
+        rtt.sample(elapsed)
+        aimd.on_success()
+        stats.latency.record(elapsed)
+        return port, "closed", elapsed, None
+    except asyncio.TimeoutError:
+        aimd.on_timeout()
+        stats.timeouts += 1
+        return port, "filtered", None, None
+    except OSError as e:
+        aimd.on_error(e.errno)
+        stats.errors += 1
+        return port, None if e.errno in _LOCAL_PRESSURE_ERRORS else "filtered", None, None
+    finally:
+        if sock is not None:
+            sock.close()
+
+async def _read_response_async(loop, sock, size, timeout):
+    """
+    Read what a service sends on a connected socket, at most `size`
+    bytes within `timeout` seconds. Returns the bytes or None.
+    """
+    deadline = loop.time() + timeout
+    response = b""
+    try:
+        while len(response) < size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            chunk = await asyncio.wait_for(loop.sock_recv(sock, size - len(response)), remaining)
+            if not chunk:
+                break
+            response += chunk
+            if b"\n" in chunk:
+                # Line-oriented greetings are complete after one line
+                break
+    except (asyncio.TimeoutError, OSError):
+        pass
+    return response or None
+
+async def _grab_banner_async(loop, sock, port, size, timeout):
+    """
+    Read the banner of a service on an already connected socket. If it
+    stays silent, send the most likely signature-database probe for
+    this port (GET request for web ports...) on the same socket.
+    Returns (probe name, response bytes or None).
+    The caller owns (and closes) the socket.
+    """
+    probe = next((p for p in get_service_database().probes_for(port) if p.payload), None)
+    banner = await _read_response_async(loop, sock, size, timeout / 2 if probe else timeout)
+    if banner is not None or probe is None:
+        return "NULL", banner
+    try:
+        await asyncio.wait_for(loop.sock_sendall(sock, probe.payload), timeout / 2)
+    except (asyncio.TimeoutError, OSError):
+        return "NULL", None
+    return probe.name, await _read_response_async(loop, sock, size, timeout / 2)
+
+def format_banner(banner, width=60):
+    """First printable line of a banner, truncated for display"""
+    if not banner:
+        return ""
+    line = banner.decode("utf-8", errors="replace").strip().splitlines()
+    line = "".join(c if c.isprintable() else "." for c in line[0]) if line else ""
+    return line if len(line) <= width else line[:width - 3] + "..."
+
+async def scan_ports_async(target, ports, concurrency=500, timeout=0.5):
+    """
+    Scan many ports on the target concurrently on one event loop
+    (see scan_events_async).
+    Async generator yielding (port, is_open) tuples as probes complete,
+    so results arrive in completion order, not port order.
+    """
+    scan = scan_events_async(target, ports, concurrency=concurrency, timeout=timeout)
+    try:
+        async for event in scan:
+            yield event.port, event.state == "open"
+    finally:
+        await scan.aclose()
+
+async def scan_events_async(target, ports, concurrency=500, timeout=0.5,
+                            grab_banners=False, banner_size=1024, banner_timeout=2.0, stats=None,
+                            cancel=None):
+    """
+    Scan many ports on the target concurrently on one event loop.
+    The number of connects in flight follows the target's AIMD
+    congestion window, capped at `concurrency` and by the free socket
+    slots of the file-descriptor budget; new connects are paced by the
+    shared rate limiter.
+    A timeout of None derives it from the target's measured RTT.
+    With grab_banners the socket that found a port open is kept to read
+    its banner (capped at banner_size bytes and banner_timeout seconds)
+    concurrently with the rest of the scan, outside the probe window;
+    the banner is matched against the service signature database.
+    Progress, latency and error counters are kept in `stats` (a
+    ScanStats) for live display. When the `cancel` CancelToken fires the
+    generator ends at once, aborting the connects and banner grabs in
+    flight; their results are not reported.
+    Async generator yielding ScanEvent tuples as probes complete. No new
+    probe is started while the consumer is not pulling (backpressure).
+    """
+    if stats is None:
+        stats = ScanStats()
+    if cancel is None:
+        cancel = CancelToken()
+    loop = asyncio.get_running_loop()
+    address = await loop.run_in_executor(None, resolve_host, target)
+    rtt = get_rtt_estimator(address)
+    aimd = get_congestion_controller(address)
+    budget = get_fd_budget()
+
+    port_iter = iter(ports)
+    retry = deque()
+    pending = set()
+    grabbing = {}  # banner task -> (port, connect rtt)
+    exhausted = False
+
+    def release_slot(task):
+        # A socket handed over to a banner grab keeps its slot until closed
+        if task.cancelled() or task.exception() is not None or task.result()[3] is None:
+            budget.release()
+
+    def start_banner_grab(port, elapsed, sock):
+        task = asyncio.ensure_future(_grab_banner_async(loop, sock, port, banner_size, banner_timeout))
+        task.add_done_callback(lambda _, sock=sock: (sock.close(), budget.release()))
+        grabbing[task] = (port, elapsed)
+
+    def refill():
+        nonlocal exhausted
+        stats.window = min(concurrency, aimd.limit)
+        granted = rate_limiter.take(stats.window - len(pending))
+        while granted > 0:
+            if retry:
+                port = retry[0]
+            else:
+                port = None if exhausted else next(port_iter, None)
+                if port is None:
+                    exhausted = True
+                    break
+                retry.append(port)
+            if not budget.try_acquire():
+                break
+            retry.popleft()
+            granted -= 1
+            probe_timeout = rtt.timeout() if timeout is None else timeout
+            task = asyncio.ensure_future(_probe_port_async(loop, address, port, probe_timeout,
+                                                           rtt, aimd, stats, keep_open=grab_banners))
+            task.add_done_callback(release_slot)
+            pending.add(task)
+            stats.sent += 1
+        rate_limiter.refund(granted)
+        stats.in_flight = len(pending) + len(grabbing)
+
+    cancelled, release_cancel = _cancel_future(loop, cancel)
+    try:
+        refill()
+        while pending or grabbing or retry or not exhausted:
+            if not pending and not grabbing:
+                # Nothing in flight: wait for a token or a free socket slot
+                await asyncio.wait({cancelled}, timeout=rate_limiter.wait_time() or 0.01)
+                if cancelled.done():
+                    break
+                refill()
+                continue
+            # Wake up early when the rate limiter is what holds probes back
+            done, _ = await asyncio.wait(pending | grabbing.keys() | {cancelled},
+                                         timeout=rate_limiter.wait_time() or None,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if cancelled.done():
+                break
+            events = []
+            for task in done:
+                if task in grabbing:
+                    port, elapsed = grabbing.pop(task)
+                    probe, banner = task.result()
+                    events.append(_make_event(target, port, "open", elapsed, banner, probe))
+                    continue
+                pending.discard(task)
+                port, state, elapsed, sock = task.result()
+                if state is None:
+                    retry.append(port)
+                elif sock is not None:
+                    start_banner_grab(port, elapsed, sock)
+                else:
+                    events.append(_make_event(target, port, state, elapsed))
+            refill()
+            stats.completed += len(events)
+            for event in events:
+                yield event
+    finally:
+        release_cancel()
+        stats.in_flight = 0
+        # Consumer stopped early or cancelled: drop the probes and grabs still running
+        tasks = list(pending) + list(grabbing)
+        for task in tasks:
+            if task in pending and task.done() and not task.cancelled() \
+                    and task.exception() is None and task.result()[3] is not None:
+                # Open socket no banner grab took over yet
+                task.result()[3].close()
+                budget.release()
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+# connect_ex() codes meaning "handshake started, wait for writability"
+# (EAGAIN is not one of them on Linux: it means no local port is free)
+_CONNECT_IN_PROGRESS = {
+    errno.EINPROGRESS, errno.EALREADY,
+    getattr(errno, "WSAEWOULDBLOCK", errno.EINPROGRESS),
+}
+
+def scan_probes_select(probes, timeout=0.5, batch_size=1000, cancel=None):
+    """
+    Probe (host, port) pairs with the selector backend
+    (see iter_probe_events).
+    Generator yielding (host, port, is_open) tuples in completion order.
+    """
+    events = iter_probe_events(probes, timeout=timeout, batch_size=batch_size, cancel=cancel)
+    try:
+        for event in events:
+            yield event.host, event.port, event.state == "open"
+    finally:
+        events.close()
+
+def iter_probe_events(probes, timeout=0.5, batch_size=1000, cancel=None):
+    """
+    Probe (host, port) pairs with non-blocking connects multiplexed by a
+    selector (epoll on Linux), without threads or asyncio.
+    Connects are issued in batches of up to `batch_size` sockets, further
+    limited by each target's AIMD congestion window, the free socket
+    slots of the file-descriptor budget and the shared rate limiter,
+    and their outcome is read from SO_ERROR once writable.
+    A timeout of None derives it from each target's measured RTT.
+    Generator yielding ScanEvent tuples in completion order. No new probe
+    is started while the consumer is not pulling (backpressure). The
+    generator ends at once when the `cancel` CancelToken fires, dropping
+    the connects in flight.
+    """
+    if platform.system().lower() == "windows":
+        # select() on Windows is limited to 512 sockets per call
+        batch_size = min(batch_size, 500)
+    if cancel is None:
+        cancel = CancelToken()
+
+    budget = get_fd_budget()
+    selector = selectors.DefaultSelector()
+    probe_iter = iter(probes)
+    ready = deque()       # probes to issue before pulling new ones
+    blocked = {}          # address -> probes waiting for its AIMD window
+    targets = {}          # host -> (address, rtt, aimd, in-flight count), hosts in flight only
+    in_flight = {}        # socket -> (host, port, start time)
+    deadlines = []        # heap of (deadline, sequence, socket)
+    sequence = itertools.count()
+
+    def target_state(host):
+        state = targets.get(host)
+        if state is None:
+            address = resolve_host(host)
+            state = targets[host] = [address, get_rtt_estimator(address),
+                                     get_congestion_controller(address), 0]
+        return state
+
+    def forget_idle(host, state):
+        # Keep memory bounded by the probes in flight, not the hosts seen
+        if state[3] == 0:
+            targets.pop(host, None)
+
+    def close(sock):
+        host, port, started = in_flight.pop(sock)
+        selector.unregister(sock)
+        sock.close()
+        budget.release()
+        state = targets[host]
+        state[3] -= 1
+        waiting = blocked.get(state[0])
+        if waiting:
+            ready.append(waiting.popleft())
+            if not waiting:
+                del blocked[state[0]]
+        forget_idle(host, state)
+        return host, port, started, state
+
+    try:
+        with _cancel_waker(selector, cancel) as waker:
+            exhausted = False
+            while not cancel.cancelled:
+                # Issue a batch of non-blocking connects
+                granted = rate_limiter.take(batch_size - len(in_flight))
+                while granted > 0 and not cancel.cancelled:
+                    if ready:
+                        host, port = ready.popleft()
+                    elif not exhausted:
+                        probe = next(probe_iter, None)
+                        if probe is None:
+                            exhausted = True
+                            continue
+                        host, port = probe
+                    else:
+                        break
+                    try:
+                        state = target_state(host)
+                    except OSError:
+                        # Unresolvable host: the probe cannot succeed
+                        yield _make_event(host, port, "filtered")
+                        continue
+                    address, rtt, aimd, host_in_flight = state
+                    if host_in_flight >= aimd.limit:
+                        blocked.setdefault(address, deque()).append((host, port))
+                        continue
+                    if not budget.try_acquire():
+                        ready.appendleft((host, port))
+                        forget_idle(host, state)
+                        break
+                    granted -= 1
+                    started = time.monotonic()
+                    try:
+                        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                    except OSError as e:
+                        err = e.errno
+                    else:
+                        sock.setblocking(False)
+                        err = sock.connect_ex((address, port))
+                        if err not in _CONNECT_IN_PROGRESS:
+                            sock.close()
+                    if err not in _CONNECT_IN_PROGRESS:
+                        budget.release()
+                    if err in _LOCAL_PRESSURE_ERRORS:
+                        # Local resources exhausted: shrink and try again later
+                        aimd.on_error(err)
+                        ready.append((host, port))
+                        forget_idle(host, state)
+                        break
+                    if err not in _CONNECT_IN_PROGRESS:
+                        forget_idle(host, state)
+                        if err in _CONNECT_ANSWERED:
+                            aimd.on_success()
+                            yield _make_event(host, port, "open" if err == 0 else "closed",
+                                              time.monotonic() - started)
+                        else:
+                            yield _make_event(host, port, "filtered")
+                        continue
+                    probe_timeout = rtt.timeout() if timeout is None else timeout
+                    selector.register(sock, selectors.EVENT_WRITE)
+                    in_flight[sock] = (host, port, started)
+                    state[3] += 1
+                    heapq.heappush(deadlines, (started + probe_timeout, next(sequence), sock))
+                rate_limiter.refund(granted)
+
+                more_work = bool(ready) or not exhausted
+                if not in_flight:
+                    if not more_work:
+                        break
+                    # Wait for a token or a free socket slot
+                    cancel.wait(rate_limiter.wait_time() or 0.01)
+                    continue
+
+                # Drop deadline entries of sockets that already completed
+                while deadlines and deadlines[0][2] not in in_flight:
+                    heapq.heappop(deadlines)
+
+                for key, _ in selector.select(_select_timeout(deadlines[0][0], more_work)):
+                    sock = key.fileobj
+                    if sock is waker or cancel.cancelled:
+                        break
+                    err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    host, port, started, state = close(sock)
+                    if err in _CONNECT_ANSWERED:
+                        elapsed = time.monotonic() - started
+                        state[1].sample(elapsed)
+                        state[2].on_success()
+                        yield _make_event(host, port, "open" if err == 0 else "closed", elapsed)
+                    else:
+                        state[2].on_error(err)
+                        yield _make_event(host, port, "filtered")
+
+                if cancel.cancelled:
+                    break
+
+                # Expire connects that passed their deadline
+                now = time.monotonic()
+                while deadlines and deadlines[0][0] <= now:
+                    _, _, sock = heapq.heappop(deadlines)
+                    if sock in in_flight:
+                        host, port, _, state = close(sock)
+                        state[2].on_timeout()
+                        yield _make_event(host, port, "filtered")
+    finally:
+        for sock in list(in_flight):
+            close(sock)
+        selector.close()
+
+def scan_ports_select(target, ports, timeout=0.5, batch_size=1000):
+    """
+    Scan many ports of one target with the selector backend
+    (see scan_probes_select).
+    Generator yielding (port, is_open) tuples in completion order.
+    """
+    # Resolve up front so that resolution errors reach the caller
+    resolve_host(target)
+    probes = ((target, port) for port in ports)
+    scan = scan_probes_select(probes, timeout=timeout, batch_size=batch_size)
+    try:
+        for _, port, is_open in scan:
+            yield port, is_open
+    finally:
+        scan.close()
+
+def iter_scan_events(targets, ports, timeout=0.5, seed=None, start=0, batch_size=1000, cancel=None):
+    """
+    Stream the scan of every (target, port) pair as ScanEvent tuples.
+    Targets and ports are any indexable sequences (TargetSpec, PortSet
+    converted to a list, ...); probes follow the ProbeSpace order from
+    position `start`, pseudo-random when a seed is given.
+    This is the structured result stream shared by the GUI, exporters
+    and database writers; it pulls probes lazily (backpressure) and
+    stops when the `cancel` CancelToken fires.
+    """
+    space = ProbeSpace(targets, list(ports), seed=seed)
+    probes = ((host, port) for _, host, port in space.iter_range(start))
+    events = iter_probe_events(probes, timeout=timeout, batch_size=batch_size, cancel=cancel)
+    try:
+        yield from events
+    finally:
+        events.close()
+
+def scan_ports(target, ports, timeout=0.5, backend="select"):
+    """
+    Scan many ports synchronously with the chosen backend:
+    "select" (non-blocking multiplexer) or "blocking" (one port_scan()
+    call per port).
+    Generator yielding (port, is_open) tuples.
+    """
+    if backend == "select":
+        yield from scan_ports_select(target, ports, timeout=timeout)
+    elif backend == "blocking":
+        for port in ports:
+            yield port, port_scan(target, port, timeout=timeout)
+    else:
+        raise ValueError(f"Unknown scan backend: {backend}")
+
+# IP_RECVERR queues the ICMP errors of unconnected UDP sockets, with the
+# destination that triggered them (Linux only, not exported by Python)
+_IP_RECVERR = getattr(socket, "IP_RECVERR", 11) if platform.system() == "Linux" else None
+_SO_EE_ORIGIN_ICMP = 2
+_ICMP_DEST_UNREACH = 3
+_ICMP_PORT_UNREACH = 3
+
+def _udp_probe(port):
+    """(probe name, payload) of the UDP probe for a port, empty datagram if none"""
+    for probe in get_service_database().probes_for(port, "UDP"):
+        if port in probe.ports:
+            return probe.name, probe.payload
+    return None, b""
+
+def _read_icmp_errors(sock):
+    """Yield ((address, port), state) for the ICMP errors queued on a UDP socket"""
+    while True:
+        try:
+            _, ancdata, _, destination = sock.recvmsg(512, 512, socket.MSG_ERRQUEUE)
+        except OSError:
+            return
+        for level, kind, data in ancdata:
+            if level != socket.IPPROTO_IP or kind != _IP_RECVERR or len(data) < 8:
+                continue
+            _, origin, icmp_type, code = struct.unpack_from("=IBBB", data)
+            if origin == _SO_EE_ORIGIN_ICMP and icmp_type == _ICMP_DEST_UNREACH:
+                yield destination[:2], "closed" if code == _ICMP_PORT_UNREACH else "filtered"
+
+def iter_udp_events(probes, timeout=1.0, retries=2, sockets=4, batch_size=1000, size=2048, stats=None,
+                    cancel=None):
+    """
+    Probe (host, port) pairs over UDP from a small pool of non-blocking
+    sockets multiplexed by a selector.
+    Each port gets the signature database's UDP payload for it (DNS,
+    NTP, SNMP, SSDP...) or an empty datagram, and is sent again up to
+    `retries` times when nothing answers. Responses are matched by
+    source address and port: "open". ICMP port-unreachable errors
+    (Linux) give "closed", other unreachable codes "filtered", and
+    silence after the last retry "open|filtered".
+    Up to `batch_size` probes are in flight, paced by the shared rate
+    limiter. A timeout of None derives it from each target's RTT.
+    Live counters are kept in `stats` (a ScanStats); every unanswered
+    transmission counts as a timeout. The generator ends at once when
+    the `cancel` CancelToken fires, dropping the probes in flight.
+    Generator yielding ScanEvent tuples in completion order.
+    """
+    if stats is None:
+        stats = ScanStats()
+    if cancel is None:
+        cancel = CancelToken()
+    stats.window = batch_size
+    budget = get_fd_budget()
+    selector = selectors.DefaultSelector()
+    probe_iter = iter(probes)
+    pool = []
+    ready = deque()       # probes to send before pulling new ones
+    resend = deque()      # in-flight probes due for a retransmission
+    addresses = {}        # host -> address
+    in_flight = {}        # (address, port) -> [host, port, probe, payload, sends left, sent at]
+    deadlines = []        # heap of (deadline, sequence, key, sent at)
+    sequence = itertools.count()
+    icmp_errors = []      # (key, state) read from error queues while sending
+
+    def send(key, entry):
+        """Send (or resend) a probe; False when the socket buffer is full"""
+        sock = pool[next(sequence) % len(pool)]
+        probe_timeout = get_rtt_estimator(key[0]).timeout() if timeout is None else timeout
+        for attempt in range(2):
+            try:
+                sock.sendto(entry[3], key)
+                entry[4] -= 1
+                stats.sent += 1
+                break
+            except (BlockingIOError, InterruptedError):
+                return False
+            except OSError:
+                if attempt == 0 and _IP_RECVERR is not None:
+                    # Likely the queued ICMP error of an earlier probe,
+                    # reported instead of sending: collect it and retry
+                    icmp_errors.extend(_read_icmp_errors(sock))
+                    continue
+                # No route, host unreachable...: expire at once as filtered
+                stats.errors += 1
+                entry[4] = -1
+                probe_timeout = 0.0
+                break
+        now = time.monotonic()
+        entry[5] = now
+        heapq.heappush(deadlines, (now + probe_timeout, next(sequence), key, now))
+        return True
+
+    def finish(key, state, rtt=None, response=None):
+        host, port, probe = in_flight.pop(key)[:3]
+        stats.completed += 1
+        stats.in_flight = len(in_flight)
+        return _make_event(host, port, state, rtt, response, probe, protocol="udp")
+
+    try:
+        for _ in range(max(1, sockets)):
+            budget.acquire()
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            except OSError:
+                budget.release()
+                raise
+            pool.append(sock)
+            sock.setblocking(False)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            except OSError:
+                pass
+            if _IP_RECVERR is not None:
+                sock.setsockopt(socket.IPPROTO_IP, _IP_RECVERR, 1)
+            selector.register(sock, selectors.EVENT_READ)
+        with _cancel_waker(selector, cancel) as waker:
+            exhausted = False
+            while not cancel.cancelled:
+                # Retransmissions first, then new probes
+                granted = rate_limiter.take(len(resend) + max(0, batch_size - len(in_flight)))
+                while granted > 0 and resend:
+                    key = resend[0]
+                    if key not in in_flight:
+                        resend.popleft()  # answered while waiting
+                        continue
+                    if not send(key, in_flight[key]):
+                        break
+                    resend.popleft()
+                    granted -= 1
+                blocked = []  # probes for an (address, port) already in flight
+                while granted > 0 and len(in_flight) < batch_size:
+                    if ready:
+                        host, port = ready.popleft()
+                    elif not exhausted:
+                        probe = next(probe_iter, None)
+                        if probe is None:
+                            exhausted = True
+                            continue
+                        host, port = probe
+                    else:
+                        break
+                    try:
+                        address = addresses.get(host) or addresses.setdefault(host, resolve_host(host))
+                    except OSError:
+                        # Unresolvable host: the probe cannot succeed
+                        stats.errors += 1
+                        stats.completed += 1
+                        yield _make_event(host, port, "filtered", protocol="udp")
+                        continue
+                    key = (address, port)
+                    if key in in_flight:
+                        blocked.append((host, port))
+                        continue
+                    name, payload = _udp_probe(port)
+                    entry = [host, port, name, payload, retries + 1, None]
+                    in_flight[key] = entry
+                    if not send(key, entry):
+                        del in_flight[key]
+                        ready.appendleft((host, port))
+                        break
+                    granted -= 1
+                ready.extend(blocked)
+                rate_limiter.refund(granted)
+                stats.in_flight = len(in_flight)
+                for key, state in icmp_errors:
+                    if key in in_flight:
+                        yield finish(key, state)
+                icmp_errors.clear()
+
+                more_work = bool(ready) or bool(resend) or not exhausted
+                if not in_flight:
+                    if not more_work:
+                        break
+                    cancel.wait(rate_limiter.wait_time() or 0.01)
+                    continue
+
+                # Drop deadline entries of probes answered or sent again since
+                while deadlines and (deadlines[0][2] not in in_flight
+                                     or in_flight[deadlines[0][2]][5] != deadlines[0][3]):
+                    heapq.heappop(deadlines)
+                wait = _select_timeout(deadlines[0][0] if deadlines else None, more_work)
+                for selector_key, _ in selector.select(wait):
+                    sock = selector_key.fileobj
+                    if sock is waker or cancel.cancelled:
+                        break
+                    while True:
+                        try:
+                            data, source = sock.recvfrom(size)
+                        except (BlockingIOError, InterruptedError):
+                            break
+                        except OSError:
+                            # An ICMP error is pending: read it from the error queue
+                            if _IP_RECVERR is None:
+                                continue
+                            for key, state in _read_icmp_errors(sock):
+                                if key in in_flight:
+                                    yield finish(key, state)
+                            continue
+                        key = source[:2]
+                        entry = in_flight.get(key)
+                        if entry is None:
+                            continue  # late duplicate or unsolicited datagram
+                        elapsed = time.monotonic() - entry[5]
+                        if entry[4] == retries:
+                            # Only unambiguous (not retransmitted) probes are timed
+                            get_rtt_estimator(key[0]).sample(elapsed)
+                            stats.latency.record(elapsed)
+                        yield finish(key, "open", elapsed, data)
+
+                if cancel.cancelled:
+                    break
+
+                # Retransmit or give up on probes that passed their deadline
+                now = time.monotonic()
+                while deadlines and deadlines[0][0] <= now:
+                    _, _, key, sent = heapq.heappop(deadlines)
+                    entry = in_flight.get(key)
+                    if entry is None or entry[5] != sent:
+                        continue
+                    if entry[4] >= 0:
+                        stats.timeouts += 1
+                    if entry[4] > 0:
+                        resend.append(key)
+                    else:
+                        yield finish(key, "filtered" if entry[4] < 0 else "open|filtered")
+    finally:
+        stats.in_flight = 0
+        for sock in pool:
+            selector.unregister(sock)
+            sock.close()
+            budget.release()
+        selector.close()
+
+def scan_udp_ports(target, ports, timeout=1.0, retries=2, stats=None, cancel=None):
+    """
+    Scan many UDP ports of one target (see iter_udp_events).
+    Generator yielding ScanEvent tuples in completion order.
+    """
+    # Resolve up front so that resolution errors reach the caller
+    resolve_host(target)
+    events = iter_udp_events(((target, port) for port in ports), timeout=timeout, retries=retries,
+                             stats=stats, cancel=cancel)
+    try:
+        yield from events
+    finally:
+        events.close()
+
+# Probe space and stop event of the current worker process, set by _init_worker()
+_worker_space = None
+_worker_stop = None
+
+def _init_worker(space, rate, stop):
+    """Worker process initializer: receive the probe space once"""
+    global _worker_space, _worker_stop
+    _worker_space = space
+    _worker_stop = stop
+    set_max_rate(rate)
+
+def _scan_shard(start, stop, timeout):
+    """
+    Worker process entry point: scan positions start..stop-1 of the
+    probe space with the selector backend.
+    Returns [(host, port, is_open)] in position order, or [] once the
+    parent has cancelled the scan.
+    """
+    shard = [(host, port) for _, host, port in _worker_space.iter_range(start, stop)]
+    # Stop issuing connects as soon as the parent cancels
+    probes = itertools.takewhile(lambda probe: not _worker_stop.is_set(), shard)
+    open_probes = {(host, port) for host, port, is_open in scan_probes_select(probes, timeout=timeout)
+                   if is_open}
+    if _worker_stop.is_set():
+        return []
+    return [(host, port, (host, port) in open_probes) for host, port in shard]
+
+def scan_matrix_parallel(hosts, ports, timeout=0.5, workers=None, shard_size=4096, seed=None, start=0,
+                         cancel=None):
+    """
+    Scan every (host, port) pair across a pool of worker processes,
+    each running its own selector multiplexer, so throughput scales
+    with CPU cores instead of being bound to one by the GIL.
+    The probe space is cut into contiguous position ranges; with a seed
+    positions follow a pseudo-random permutation of the whole matrix.
+    Hosts may be any indexable sequence (e.g. a TargetSpec) and are
+    never expanded into a list. The current max rate is split evenly
+    between the workers. `start` resumes the scan at a position of the
+    order (e.g. a saved checkpoint cursor).
+    When the `cancel` CancelToken fires (or the consumer stops early)
+    the queued shards are dropped and the workers stop issuing connects
+    without being waited for.
+    Generator yielding (host, port, is_open) in position order
+    (host-then-port order without a seed).
+    """
+    workers = workers or os.cpu_count() or 1
+    if cancel is None:
+        cancel = CancelToken()
+    if not hasattr(hosts, "__getitem__"):
+        hosts = list(hosts)
+    space = ProbeSpace(hosts, list(ports), seed=seed)
+    pending = deque()
+    worker_rate = rate_limiter.rate / workers if rate_limiter.rate else None
+    stop = multiprocessing.Event()
+    # Resolved on cancellation, to wake up the wait for a shard
+    cancelled = Future()
+
+    def wake():
+        stop.set()
+        cancelled.set_result(None)
+
+    def next_shard():
+        future = pending.popleft()
+        wait_futures((future, cancelled), return_when=FIRST_COMPLETED)
+        return [] if cancel.cancelled else future.result()
+
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(space, worker_rate, stop))
+    cancel.add_callback(wake)
+    finished = False
+    try:
+        # Keep a bounded window of shards queued and merge them in order
+        for shard_start in range(start, len(space), shard_size):
+            if cancel.cancelled:
+                break
+            pending.append(executor.submit(_scan_shard, shard_start, shard_start + shard_size, timeout))
+            if len(pending) < workers * 2:
+                continue
+            yield from next_shard()
+        while pending and not cancel.cancelled:
+            yield from next_shard()
+        finished = not cancel.cancelled
+    finally:
+        cancel.remove_callback(wake)
+        if not finished:
+            # Cancelled or closed early: stop the running shards too
+            stop.set()
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=finished)
+
 def system_info():
     """
     Get system information and return as string.
@@ -79,7 +1406,42 @@ def ip_lookup(target):
 def ping_host(target, count=4):
     """
     Ping a host and return the results.
+    Echoes are sent natively; the system ping command is only used
+    when ICMP sockets are not permitted.
     """
+    try:
+        address = resolve_host(target)
+    except OSError as e:
+        return f"=== TEST DE CONNECTIVITÉ ÉCHOUÉ ===\nImpossible de résoudre {target}: {e}"
+    try:
+        echo = IcmpEchoSocket()
+    except OSError:
+        return _ping_host_command(target, count)
+    echo.close()
+    
+    lines = [f"PING {target} ({address})"]
+    rtts = []
+    for sequence in range(1, count + 1):
+        rtt = icmp_echo(address, timeout=1.0)
+        if rtt is None:
+            lines.append(f"Délai d'attente dépassé (séquence={sequence})")
+        else:
+            rtts.append(rtt * 1000)
+            lines.append(f"Réponse de {address}: séquence={sequence} temps={rtt * 1000:.2f} ms")
+        if sequence < count:
+            time.sleep(max(0.0, 1.0 - (rtt or 1.0)))
+    
+    lost = (count - len(rtts)) / count * 100
+    lines.append("")
+    lines.append(f"--- Statistiques ping pour {target} ---")
+    lines.append(f"{count} paquets transmis, {len(rtts)} reçus, {lost:.0f}% de perte")
+    if rtts:
+        lines.append(f"RTT min/moy/max = {min(rtts):.2f}/{sum(rtts) / len(rtts):.2f}/{max(rtts):.2f} ms")
+        return "=== RÉSULTATS DU TEST DE CONNECTIVITÉ ===\n" + "\n".join(lines)
+    return "=== TEST DE CONNECTIVITÉ ÉCHOUÉ ===\n" + "\n".join(lines)
+
+def _ping_host_command(target, count=4):
+    """Ping a host with the system ping command"""
     try:
         system = platform.system().lower()
         
@@ -261,60 +1623,556 @@ def whois_lookup(domain):
     except Exception as e:
         return f"Erreur lors de la recherche WHOIS: {e}"
 
-def detect_service(port):
-    """Detect common services on ports"""
-    services = {
-        21: "FTP - Transfert de Fichiers", 22: "SSH - Shell Sécurisé", 23: "Telnet", 25: "SMTP - Courrier Électronique", 53: "DNS - Résolution de Noms",
-        80: "HTTP - Web", 110: "POP3 - Courrier Entrant", 143: "IMAP - Courrier Entrant", 443: "HTTPS - Web Sécurisé", 993: "IMAPS - Courrier Sécurisé",
-        995: "POP3S - Courrier Sécurisé", 3389: "RDP - Bureau à Distance", 5432: "PostgreSQL - Base de Données", 3306: "MySQL - Base de Données",
-        1433: "MSSQL - Base de Données Microsoft", 6379: "Redis - Cache de Données", 27017: "MongoDB - Base de Données NoSQL", 8080: "HTTP Alternatif",
-        8443: "HTTPS Alternatif", 2222: "SSH Alternatif", 8888: "Proxy HTTP"
-    }
-    return services.get(port, "Service Non Identifié")
+def detect_service(port, banner=None, probe="NULL", protocol="tcp"):
+    """
+    Detect the service on a port, from its banner (or the response to
+    a signature-database probe) when there is one, else from the port
+    registry
+    """
+    if banner:
+        result = match_service(banner, probe)
+        if result is not None:
+            return format_service_match(result)
+    return service_name(port, protocol)
 
-def fast_ping(host, timeout=1):
+def identify_service(host, port, timeout=2.0, intensity=7, size=1024):
     """
-    Fast ping using socket connection for network discovery.
-    Returns True if host is reachable, False otherwise.
+    Identify the service on an open TCP port by sending the signature
+    database probes, most likely first, each on a fresh connection.
+    Returns a ServiceMatch, or None if no signature matched.
     """
     try:
-        # Try to connect to common ports quickly
-        import socket
-        
-        # Test multiple common ports to increase detection chance
-        test_ports = [80, 443, 22, 21, 23, 25, 53, 135, 139, 445]
-        
-        for port in test_ports:
+        address = resolve_host(host)
+    except OSError:
+        return None
+    soft = None
+    for probe in get_service_database().probes_for(port, "TCP", intensity):
+        try:
+            with socket.create_connection((address, port), timeout=timeout) as sock:
+                if probe.payload:
+                    sock.sendall(probe.payload)
+                sock.settimeout(probe.wait or timeout)
+                response = sock.recv(size)
+        except OSError:
+            continue
+        result = match_service(response, probe.name)
+        if result is None:
+            continue
+        if not result.soft:
+            return result
+        soft = soft or result
+    return soft
+
+_ICMP_ECHO_REPLY = 0
+_ICMP_ECHO_REQUEST = 8
+
+def _icmp_checksum(data):
+    """RFC 1071 internet checksum"""
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+class IcmpEchoSocket:
+    """
+    One non-blocking ICMP socket sending echo requests to any number of
+    hosts, replies being matched by identifier, sequence and source.
+    Uses an unprivileged ping socket (SOCK_DGRAM/IPPROTO_ICMP, allowed by
+    net.ipv4.ping_group_range on Linux, always on macOS) and falls back
+    to a raw socket (root/administrator). Raises PermissionError when
+    neither is allowed.
+    """
+    PAYLOAD = b"CyberScannerPRO-echo-padding-32b"
+
+    def __init__(self):
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            self.raw = False
+        except OSError:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            self.raw = True
+        self.sock.setblocking(False)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        except OSError:
+            pass
+        # Linux ping sockets replace the identifier with their own "port"
+        self.identifier = random.getrandbits(16)
+        if not self.raw and platform.system() == "Linux":
+            self.sock.bind(("0.0.0.0", 0))
+            self.identifier = self.sock.getsockname()[1]
+        self._sequence = itertools.count(random.getrandbits(16))
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def send(self, address):
+        """
+        Send one echo request; returns its sequence number.
+        Raises BlockingIOError when the send buffer is full and OSError
+        when the host cannot be reached at all.
+        """
+        sequence = next(self._sequence) & 0xFFFF
+        header = struct.pack("!BBHHH", _ICMP_ECHO_REQUEST, 0, 0, self.identifier, sequence)
+        checksum = _icmp_checksum(header + self.PAYLOAD)
+        header = struct.pack("!BBHHH", _ICMP_ECHO_REQUEST, 0, checksum, self.identifier, sequence)
+        self.sock.sendto(header + self.PAYLOAD, (address, 0))
+        return sequence
+
+    def receive(self):
+        """Read every pending echo reply; returns [(address, sequence, time)]"""
+        replies = []
+        while True:
             try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(timeout)
-                result = sock.connect_ex((host, port))
-                sock.close()
-                
-                if result == 0:
-                    return True
-            except:
+                data, source = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return replies
+            except OSError:
                 continue
-        
-        # If no ports respond, try ICMP ping as fallback
+            received = time.monotonic()
+            if data and data[0] >> 4 == 4:
+                # Raw sockets (and macOS ping sockets) include the IP header
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < 8:
+                continue
+            kind, _, _, identifier, sequence = struct.unpack_from("!BBHHH", data)
+            # Ping sockets already filter on their identifier
+            if kind == _ICMP_ECHO_REPLY and (identifier == self.identifier or not self.raw):
+                replies.append((source[0], sequence, received))
+
+    def close(self):
+        self.sock.close()
+
+def iter_echo_replies(hosts, timeout=1.0, count=1, batch_size=1000, cancel=None):
+    """
+    Ping many hosts from a single ICMP socket: each host gets up to
+    `count` echo requests, `timeout` seconds apart, until one is
+    answered. Up to `batch_size` hosts are in flight, paced by the
+    shared rate limiter. The generator ends at once when the `cancel`
+    CancelToken fires, without reporting the hosts in flight.
+    Generator yielding (host, rtt) in completion order, rtt in seconds
+    or None when the host never answered.
+    """
+    if cancel is None:
+        cancel = CancelToken()
+    budget = get_fd_budget()
+    budget.acquire()
+    try:
+        echo = IcmpEchoSocket()
+    except OSError:
+        budget.release()
+        raise
+    selector = selectors.DefaultSelector()
+    selector.register(echo, selectors.EVENT_READ)
+    host_iter = iter(hosts)
+    ready = deque()       # hosts to ping before pulling new ones
+    in_flight = {}        # (address, sequence) -> [host, sent at, echoes left]
+    deadlines = []        # heap of (deadline, sequence number, key)
+    order = itertools.count()
+
+    def send(host, address, left):
         try:
-            system = platform.system().lower()
-            if system == "windows":
-                cmd = ["ping", "-n", "1", "-w", "1000", host]
-            else:
-                cmd = ["ping", "-c", "1", "-W", "1", host]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=3)
-            return result.returncode == 0
-        except:
-            pass
-        
+            sequence = echo.send(address)
+        except BlockingIOError:
+            raise  # send buffer full: the caller retries once writable
+        except OSError:
+            return False
+        now = time.monotonic()
+        key = (address, sequence)
+        in_flight[key] = [host, now, left - 1]
+        heapq.heappush(deadlines, (now + timeout, next(order), key))
+        return True
+
+    try:
+        with _cancel_waker(selector, cancel):
+            exhausted = False
+            send_blocked = False
+            while not cancel.cancelled:
+                if send_blocked:
+                    selector.modify(echo, selectors.EVENT_READ)
+                    send_blocked = False
+                granted = rate_limiter.take(batch_size - len(in_flight))
+                while granted > 0 and not cancel.cancelled:
+                    if ready:
+                        host, address, left = ready.popleft()
+                    elif not exhausted:
+                        host = next(host_iter, None)
+                        if host is None:
+                            exhausted = True
+                            continue
+                        try:
+                            address = resolve_host(host)
+                        except OSError:
+                            yield host, None
+                            continue
+                        left = count
+                    else:
+                        break
+                    try:
+                        if not send(host, address, left):
+                            yield host, None  # no route to host
+                            continue
+                    except BlockingIOError:
+                        # Wake up as soon as the socket can send again
+                        ready.appendleft((host, address, left))
+                        selector.modify(echo, selectors.EVENT_READ | selectors.EVENT_WRITE)
+                        send_blocked = True
+                        break
+                    granted -= 1
+                rate_limiter.refund(granted)
+
+                more_work = bool(ready) or not exhausted
+                if not in_flight:
+                    if not more_work:
+                        break
+                    if send_blocked:
+                        selector.select(0.01)
+                    else:
+                        cancel.wait(rate_limiter.wait_time() or 0.01)
+                    continue
+
+                while deadlines and deadlines[0][2] not in in_flight:
+                    heapq.heappop(deadlines)
+                if selector.select(_select_timeout(deadlines[0][0], more_work)):
+                    for address, sequence, received in echo.receive():
+                        entry = in_flight.pop((address, sequence), None)
+                        if entry is not None:
+                            yield entry[0], received - entry[1]
+                        if cancel.cancelled:
+                            break
+                if cancel.cancelled:
+                    break
+
+                # Ping again, or give up on hosts whose last echo expired
+                now = time.monotonic()
+                while deadlines and deadlines[0][0] <= now:
+                    _, _, key = heapq.heappop(deadlines)
+                    entry = in_flight.pop(key, None)
+                    if entry is None:
+                        continue
+                    if entry[2] > 0:
+                        ready.append((entry[0], key[0], entry[2]))
+                    else:
+                        yield entry[0], None
+    finally:
+        selector.close()
+        echo.close()
+        budget.release()
+
+def icmp_echo(host, timeout=1.0, count=1):
+    """Ping one host natively; returns the RTT in seconds or None"""
+    replies = iter_echo_replies([host], timeout=timeout, count=count)
+    try:
+        for _, rtt in replies:
+            return rtt
+    finally:
+        replies.close()
+    return None
+
+class AsyncIcmpPinger:
+    """
+    IcmpEchoSocket driven by the running event loop, shared by any
+    number of concurrent ping() calls. Use as an async context manager.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        if not get_fd_budget().try_acquire():
+            raise OSError(errno.EMFILE, "No socket slot left for ICMP")
+        try:
+            self.echo = IcmpEchoSocket()
+        except OSError:
+            get_fd_budget().release()
+            raise
+        self._waiting = {}  # (address, sequence) -> (future, sent at)
+        self._writable = None  # resolved when a full send buffer drains
+        self.loop.add_reader(self.echo.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        for address, sequence, received in self.echo.receive():
+            entry = self._waiting.get((address, sequence))
+            if entry is not None and not entry[0].done():
+                entry[0].set_result(received - entry[1])
+
+    def _on_writable(self):
+        self.loop.remove_writer(self.echo.fileno())
+        writable, self._writable = self._writable, None
+        if not writable.done():
+            writable.set_result(None)
+
+    async def _wait_writable(self):
+        """Wait until the socket can send again (shared by all callers)"""
+        if self._writable is None:
+            self._writable = self.loop.create_future()
+            self.loop.add_writer(self.echo.fileno(), self._on_writable)
+        await asyncio.shield(self._writable)
+
+    async def ping(self, address, timeout=1.0, count=1):
+        """RTT in seconds of the first of `count` echoes answered, or None"""
+        for _ in range(count):
+            await _acquire_rate_token_async()
+            deadline = self.loop.time() + timeout
+            sequence = None
+            while sequence is None:
+                try:
+                    sequence = self.echo.send(address)
+                except BlockingIOError:
+                    # Full send buffer: not a lost echo, send once it drains
+                    try:
+                        await asyncio.wait_for(self._wait_writable(), deadline - self.loop.time())
+                    except asyncio.TimeoutError:
+                        break
+                except OSError:
+                    return None
+            if sequence is None:
+                continue
+            key = (address, sequence)
+            future = self.loop.create_future()
+            self._waiting[key] = (future, time.monotonic())
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                continue
+            finally:
+                del self._waiting[key]
+        return None
+
+    def close(self):
+        self.loop.remove_reader(self.echo.fileno())
+        if self._writable is not None:
+            self.loop.remove_writer(self.echo.fileno())
+            self._writable.cancel()
+            self._writable = None
+        self.echo.close()
+        get_fd_budget().release()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+def _open_async_pinger():
+    """AsyncIcmpPinger, or None when ICMP sockets are not permitted"""
+    try:
+        return AsyncIcmpPinger()
+    except OSError:
+        return None
+
+# Ports probed at once by the liveness check: any answer, even a RST,
+# proves that the host is up
+LIVENESS_PORTS = (80, 443, 22, 21, 23, 25, 53, 135, 139, 445)
+
+async def _acquire_rate_token_async():
+    """Wait for a rate-limiter token"""
+    while not rate_limiter.take(1):
+        await asyncio.sleep(rate_limiter.wait_time())
+
+async def _acquire_probe_slot_async():
+    """Wait for a rate-limiter token and a free file-descriptor budget slot"""
+    budget = get_fd_budget()
+    await _acquire_rate_token_async()
+    while not budget.try_acquire():
+        await asyncio.sleep(0.01)
+
+async def _tcp_rtt_async(loop, address, port, timeout):
+    """Connect round-trip time in seconds (SYN/ACK or RST), or None"""
+    await _acquire_probe_slot_async()
+    sock = None
+    started = time.monotonic()
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        await asyncio.wait_for(loop.sock_connect(sock, (address, port)), timeout)
+        return time.monotonic() - started
+    except ConnectionRefusedError:
+        return time.monotonic() - started
+    except (asyncio.TimeoutError, OSError):
+        return None
+    finally:
+        if sock is not None:
+            sock.close()
+        get_fd_budget().release()
+
+async def _tcp_alive_async(loop, address, port, timeout):
+    """True if the host answers a connect on the port (SYN/ACK or RST)"""
+    return await _tcp_rtt_async(loop, address, port, timeout) is not None
+
+async def _icmp_alive_async(address, timeout, pinger=None):
+    """
+    True if the host answers one ICMP echo, sent natively through the
+    pinger, or with the system ping command when ICMP sockets are not
+    permitted (pinger None)
+    """
+    if pinger is not None:
+        return await pinger.ping(address, timeout) is not None
+    if platform.system().lower() == "windows":
+        cmd = ["ping", "-n", "1", "-w", str(int(timeout * 1000)), address]
+    else:
+        cmd = ["ping", "-c", "1", "-W", str(max(1, round(timeout))), address]
+    try:
+        process = await asyncio.create_subprocess_exec(*cmd, stdout=subprocess.DEVNULL,
+                                                       stderr=subprocess.DEVNULL)
+    except OSError:
         return False
-        
-    except Exception:
+    try:
+        return await asyncio.wait_for(process.wait(), timeout + 1) == 0
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+async def is_alive_async(host, timeout=1.0, ports=LIVENESS_PORTS, icmp=True, pinger=None):
+    """
+    Race TCP connects to every liveness port and an ICMP echo against a
+    host. Returns True on the first positive answer, cancelling the
+    other probes, or False once all of them failed or timed out.
+    The echo goes through `pinger` (an AsyncIcmpPinger shared by a
+    sweep) or a pinger opened for this call.
+    """
+    if icmp and pinger is None:
+        pinger = _open_async_pinger()
+        if pinger is not None:
+            async with pinger:
+                return await is_alive_async(host, timeout, ports, icmp, pinger)
+    loop = asyncio.get_running_loop()
+    try:
+        address = await loop.run_in_executor(None, resolve_host, host)
+    except OSError:
+        return False
+    pending = {asyncio.ensure_future(_tcp_alive_async(loop, address, port, timeout)) for port in ports}
+    if icmp:
+        pending.add(asyncio.ensure_future(_icmp_alive_async(address, timeout, pinger)))
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if any(task.result() for task in done):
+                return True
         return False
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+async def sweep_hosts_async(hosts, timeout=1.0, concurrency=256, ports=LIVENESS_PORTS, icmp=True,
+                            cancel=None):
+    """
+    Check many hosts concurrently with is_alive_async(), at most
+    `concurrency` hosts at a time (fewer if the file-descriptor budget
+    cannot hold all their probes). Ends at once, dropping the checks in
+    flight, when the `cancel` CancelToken fires.
+    Async generator yielding (host, alive) tuples in completion order.
+    """
+    cancelled, release_cancel = _cancel_future(asyncio.get_running_loop(), cancel or CancelToken())
+    concurrency = max(1, min(concurrency, get_fd_budget().capacity // (len(ports) + 1)))
+    host_iter = iter(hosts)
+    pending = set()
+    exhausted = False
+    # One ICMP socket for the whole sweep
+    pinger = _open_async_pinger() if icmp else None
+
+    async def check(host):
+        return host, await is_alive_async(host, timeout, ports, icmp, pinger)
 
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    pending.add(asyncio.ensure_future(check(next(host_iter))))
+                except StopIteration:
+                    exhausted = True
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending | {cancelled}, return_when=asyncio.FIRST_COMPLETED)
+            pending.discard(cancelled)
+            if cancelled.done():
+                break
+            for task in done:
+                yield task.result()
+    finally:
+        release_cancel()
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if pinger is not None:
+            pinger.close()
 
+def sweep_hosts(hosts, timeout=1.0, concurrency=256):
+    """
+    Check many hosts concurrently (see sweep_hosts_async).
+    Returns the list of hosts that answered, in completion order.
+    """
+    async def run():
+        return [host async for host, alive in sweep_hosts_async(hosts, timeout, concurrency) if alive]
+    return asyncio.run(run())
+
+async def monitor_latency_async(hosts, interval=1.0, timeout=1.0, method="icmp", port=80, cancel=None):
+    """
+    Probe every host once per `interval` seconds with an ICMP echo or,
+    with method "tcp" (or when ICMP sockets are not permitted), a TCP
+    connect to `port`, and keep per-host latency histograms, jitter
+    and loss (HostLatency).
+    Async generator yielding the LatencySnapshot list of all hosts after
+    each round; runs until the consumer stops it or the `cancel`
+    CancelToken fires (an unfinished round is then dropped).
+    """
+    loop = asyncio.get_running_loop()
+    cancelled, release_cancel = _cancel_future(loop, cancel or CancelToken())
+    stats = [HostLatency(host) for host in hosts]
+    addresses = {}
+    pinger = _open_async_pinger() if method == "icmp" else None
+
+    async def probe(host):
+        address = addresses.get(host)
+        if address is None:
+            try:
+                address = addresses[host] = await loop.run_in_executor(None, resolve_host, host)
+            except OSError:
+                return None
+        if pinger is not None:
+            return await pinger.ping(address, timeout)
+        return await _tcp_rtt_async(loop, address, port, timeout)
+
+    round_task = None
+    try:
+        next_round = loop.time()
+        while True:
+            round_task = asyncio.ensure_future(asyncio.gather(*(probe(host.host) for host in stats)))
+            await asyncio.wait({round_task, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+            if cancelled.done():
+                break
+            for host, rtt in zip(stats, round_task.result()):
+                host.record(rtt)
+            yield [host.snapshot() for host in stats]
+            # Fixed schedule; a round slower than the interval starts the next at once
+            next_round = max(next_round + interval, loop.time())
+            await asyncio.wait({cancelled}, timeout=next_round - loop.time())
+            if cancelled.done():
+                break
+    finally:
+        release_cancel()
+        if round_task is not None and not round_task.done():
+            round_task.cancel()
+            await asyncio.gather(round_task, return_exceptions=True)
+        if pinger is not None:
+            pinger.close()
+
+def fast_ping(host, timeout=1):
+    """
+    Fast liveness check for network discovery: TCP probes on common
+    ports and an ICMP echo are raced in parallel.
+    Returns True if host is reachable, False otherwise.
+    """
+    try:
+        return asyncio.run(is_alive_async(host, timeout))
+    except Exception:
+        return False
 
 # Fonction simplifiée pour obtenir l'IP locale
 def get_local_ip():
@@ -0,0 +1,303 @@
+"""
+Service signature module
+Loads a probe/match signature database (nmap-service-probes syntax) once
+and compiles it into per-probe indexes, so that identifying the service
+behind a banner only runs the regexes that can possibly match it
+"""
+
+import os
+import re
+from collections import namedtuple
+
+from src.core.port_set import PortSet, parse_port_spec
+
+DATABASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "service_probes.txt")
+
+# Identified service: soft is True when only the service is known
+# (softmatch), not the product or version
+ServiceMatch = namedtuple("ServiceMatch", "service product version info hostname soft")
+
+# Regex delimiters, flags and version fields of a match line,
+# e.g. m|^SSH-([\d.]+)-| p/OpenSSH/ v/$2/
+_FIELD_RE = re.compile(r"(cpe:|[pvihod])([/|])(.*?)\2a?")
+_REGEX_META = set(".^$*+?{}[]()|\\")
+_ESCAPES = {"r": "\r", "n": "\n", "t": "\t", "0": "\0", "\\": "\\", "a": "\a", "f": "\f", "v": "\v"}
+
+def _unescape(text):
+    """Decode \\r, \\n, \\0, \\xHH... escapes of a probe payload"""
+    out = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == "\\" and i + 1 < len(text):
+            code = text[i + 1]
+            if code == "x":
+                out.append(chr(int(text[i + 2:i + 4], 16)))
+                i += 4
+                continue
+            out.append(_ESCAPES.get(code, code))
+            i += 2
+            continue
+        out.append(char)
+        i += 1
+    return "".join(out).encode("latin-1")
+
+def _split_delimited(text):
+    """Split 'X<d>body<d>rest' on its delimiter d, return (body, rest)"""
+    delimiter = text[1]
+    end = text.index(delimiter, 2)
+    return text[2:end], text[end + 1:]
+
+def _has_top_level_alternation(pattern):
+    """True when `pattern` has a `|` outside groups and character classes"""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            # Skip the class; a leading ] (after an optional ^) is literal
+            i += 1
+            if pattern[i:i + 1] == "^":
+                i += 1
+            if pattern[i:i + 1] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(0, depth - 1)
+        elif char == "|" and depth == 0:
+            return True
+        i += 1
+    return False
+
+def _first_bytes(pattern, ignore_case):
+    """
+    Bytes a response must start with for an anchored pattern to match,
+    or None when the pattern can start with anything.
+    """
+    if not pattern.startswith("^") or len(pattern) < 2:
+        return None
+    # ^a|^b: each branch may start differently
+    if _has_top_level_alternation(pattern):
+        return None
+    char = pattern[1]
+    rest = 2
+    if char == "\\":
+        code = pattern[2:3]
+        if code == "x":
+            value, rest = int(pattern[3:5], 16), 5
+        elif code == "0":
+            value, rest = 0, 3
+        elif code in _ESCAPES:
+            value, rest = ord(_ESCAPES[code]), 3
+        elif code and not code.isalnum():
+            value, rest = ord(code), 3
+        else:
+            return None  # \d, \w, \s... classes
+    elif char in _REGEX_META:
+        return None
+    else:
+        value = ord(char)
+    # A quantifier could make the first atom optional
+    if pattern[rest:rest + 1] in ("?", "*", "{"):
+        return None
+    if ignore_case and chr(value).isalpha():
+        return {ord(chr(value).lower()), ord(chr(value).upper())}
+    return {value}
+
+class Signature:
+    """One compiled match or softmatch line"""
+
+    def __init__(self, service, pattern, flags, fields, soft):
+        self.service = service
+        self.soft = soft
+        self.fields = fields
+        re_flags = (re.IGNORECASE if "i" in flags else 0) | (re.DOTALL if "s" in flags else 0)
+        self.regex = re.compile(pattern.encode("latin-1"), re_flags)
+        self.first = _first_bytes(pattern, "i" in flags)
+
+    def match(self, response):
+        """ServiceMatch for a response, or None"""
+        found = self.regex.match(response)
+        if found is None:
+            return None
+
+        def expand(name):
+            template = self.fields.get(name)
+            if not template:
+                return ""
+            def group(ref):
+                index = int(ref.group(1))
+                value = found.group(index) if index <= found.re.groups else None
+                return value.decode("latin-1") if value else ""
+            return re.sub(r"\$(\d)", group, template).strip()
+
+        return ServiceMatch(self.service, expand("p"), expand("v"), expand("i"), expand("h"), self.soft)
+
+class Probe:
+    """
+    One probe and its signatures.
+    Signatures anchored on a literal first byte are bucketed by that
+    byte; a response is only tried against its bucket (which keeps the
+    unanchored signatures in file order).
+    """
+
+    def __init__(self, protocol, name, payload):
+        self.protocol = protocol
+        self.name = name
+        self.payload = payload
+        self.ports = PortSet()
+        self.rarity = 5
+        self.fallback = []
+        self.wait = None  # totalwaitms in seconds
+        self.signatures = []
+        self._buckets = None
+        self._generic = None
+
+    def compile(self):
+        """Build the first-byte index once all signatures are loaded"""
+        self._generic = [sig for sig in self.signatures if sig.first is None]
+        first_bytes = set()
+        for sig in self.signatures:
+            if sig.first is not None:
+                first_bytes |= sig.first
+        self._buckets = {
+            value: [sig for sig in self.signatures if sig.first is None or value in sig.first]
+            for value in first_bytes
+        }
+
+    def candidates(self, response):
+        """Signatures that can match a response, in file order"""
+        if not response:
+            return ()
+        return self._buckets.get(response[0], self._generic)
+
+    def match(self, response):
+        """First hard match, else first soft match, else None"""
+        soft = None
+        for sig in self.candidates(response):
+            if soft is not None and sig.soft:
+                continue
+            result = sig.match(response)
+            if result is None:
+                continue
+            if not result.soft:
+                return result
+            soft = soft or result
+        return soft
+
+class ServiceDatabase:
+    """Parsed and indexed probe/signature database"""
+
+    def __init__(self, path=DATABASE_PATH):
+        self.probes = []
+        self.by_name = {}
+        self._order_cache = {}
+        self._load(path)
+
+    def _load(self, path):
+        probe = None
+        with open(path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                directive, _, args = line.partition(" ")
+                try:
+                    if directive == "Probe":
+                        protocol, name, payload = args.split(" ", 2)
+                        body, _ = _split_delimited(payload)
+                        probe = Probe(protocol.upper(), name, _unescape(body))
+                        self.probes.append(probe)
+                        self.by_name[name] = probe
+                    elif probe is None:
+                        raise ValueError("directive avant le premier Probe")
+                    elif directive in ("match", "softmatch"):
+                        service, expression = args.split(" ", 1)
+                        pattern, rest = _split_delimited(expression)
+                        flags, _, rest = rest.partition(" ")
+                        fields = {name.rstrip(":"): value for name, _, value in _FIELD_RE.findall(rest)}
+                        probe.signatures.append(Signature(service, pattern, flags, fields,
+                                                          directive == "softmatch"))
+                    elif directive == "ports":
+                        probe.ports |= parse_port_spec(args)
+                    elif directive == "rarity":
+                        probe.rarity = int(args)
+                    elif directive == "fallback":
+                        probe.fallback = [name.strip() for name in args.split(",")]
+                    elif directive == "totalwaitms":
+                        probe.wait = int(args) / 1000
+                except (ValueError, re.error) as e:
+                    raise ValueError(f"{os.path.basename(path)}:{number}: {e}") from e
+        for probe in self.probes:
+            probe.compile()
+
+    def probes_for(self, port, protocol="TCP", intensity=7):
+        """
+        Probes to send to a port, most likely first: NULL (banner),
+        then the probes listing this port, then the others up to the
+        given rarity.
+        """
+        key = (port, protocol, intensity)
+        order = self._order_cache.get(key)
+        if order is None:
+            probes = [p for p in self.probes if p.protocol == protocol]
+            listed = [p for p in probes if p.payload and port in p.ports]
+            others = [p for p in probes if p.payload and port not in p.ports and p.rarity <= intensity]
+            order = [p for p in probes if not p.payload] + sorted(listed, key=lambda p: p.rarity) \
+                + sorted(others, key=lambda p: p.rarity)
+            self._order_cache[key] = order
+        return order
+
+    def match(self, response, probe_name="NULL"):
+        """
+        Identify the service behind the response to a probe.
+        The probe's signatures are tried first, then its fallbacks
+        (and the NULL banner signatures, which apply to any probe).
+        Returns a ServiceMatch or None.
+        """
+        if not response:
+            return None
+        probe = self.by_name.get(probe_name)
+        chain = [probe] if probe else []
+        for name in (probe.fallback if probe else []) + ["NULL"]:
+            fallback = self.by_name.get(name)
+            if fallback is not None and fallback not in chain:
+                chain.append(fallback)
+        soft = None
+        for candidate in chain:
+            result = candidate.match(response)
+            if result is None:
+                continue
+            if not result.soft:
+                return result
+            soft = soft or result
+        return soft
+
+_database = None
+
+def get_service_database():
+    """Service database, loaded and compiled on first use"""
+    global _database
+    if _database is None:
+        _database = ServiceDatabase()
+    return _database
+
+def match_service(response, probe_name="NULL"):
+    """Identify a service from a response (see ServiceDatabase.match)"""
+    return get_service_database().match(response, probe_name)
+
+def format_service_match(result):
+    """Short display name, e.g. 'SSH - OpenSSH 9.6 (protocol 2.0)'"""
+    name = result.service.upper()
+    product = " ".join(part for part in (result.product, result.version) if part)
+    if not product:
+        return name
+    if result.info:
+        product += f" ({result.info})"
+    return f"{name} - {product}"
@@ -0,0 +1,68 @@
+"""
+Port-to-service registry module
+Maps TCP/UDP port numbers to service labels through port-indexed arrays
+loaded lazily from a precomputed table, so that a lookup is one array
+read and one tuple read with nothing rebuilt per call
+"""
+
+import os
+import threading
+from array import array
+
+REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "port_services.txt")
+
+UNKNOWN_SERVICE = "Service Non Identifié"
+
+_PROTOCOLS = ("tcp", "udp")
+
+class ServiceRegistry:
+    """
+    Service labels of every port, per protocol.
+    Each protocol has a 65536-entry array of unsigned shorts (128 KB)
+    holding an index into a shared tuple of labels; index 0 means no
+    registered service.
+    """
+
+    def __init__(self, path=REGISTRY_PATH):
+        labels = [None]
+        label_index = {}
+        self._ports = {protocol: array("H", bytes(2 * 65536)) for protocol in _PROTOCOLS}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                entry, label = line.split(" ", 1)
+                port, protocol = entry.split("/")
+                table = self._ports.get(protocol)
+                if table is None:
+                    continue
+                index = label_index.get(label)
+                if index is None:
+                    index = label_index[label] = len(labels)
+                    labels.append(label)
+                table[int(port)] = index
+        self._labels = tuple(labels)
+
+    def lookup(self, port, protocol="tcp"):
+        """Service label of a port, or None if none is registered"""
+        return self._labels[self._ports[protocol][port]]
+
+    def __len__(self):
+        return sum(1 for table in self._ports.values() for index in table if index)
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_service_registry():
+    """Service registry, loaded on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ServiceRegistry()
+    return _registry
+
+def service_name(port, protocol="tcp"):
+    """Registered service label of a port, or UNKNOWN_SERVICE"""
+    return get_service_registry().lookup(port, protocol) or UNKNOWN_SERVICE
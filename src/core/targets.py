@@ -0,0 +1,165 @@
+"""
+Target specification module
+Parses CIDR blocks, octet ranges, address ranges, hostnames and target
+files, and expands them lazily so that very large address spaces can
+be counted, indexed and streamed without building a list of addresses
+"""
+
+import bisect
+import ipaddress
+
+class _AddressRange:
+    """Contiguous IPv4 range: single address, CIDR block or a-b range"""
+
+    def __init__(self, first, last):
+        if first > last:
+            first, last = last, first
+        self.first = first
+        self.last = last
+
+    def __len__(self):
+        return self.last - self.first + 1
+
+    def __getitem__(self, index):
+        return str(ipaddress.IPv4Address(self.first + index))
+
+    def __iter__(self):
+        for value in range(self.first, self.last + 1):
+            yield str(ipaddress.IPv4Address(value))
+
+class _OctetRange:
+    """Per-octet ranges such as 192.168.1-3.1-254 or 10.0.*.1"""
+
+    def __init__(self, octets):
+        self.octets = octets  # four (start, end) pairs
+
+    def __len__(self):
+        count = 1
+        for start, end in self.octets:
+            count *= end - start + 1
+        return count
+
+    def __getitem__(self, index):
+        parts = []
+        for start, end in reversed(self.octets):
+            size = end - start + 1
+            index, offset = divmod(index, size)
+            parts.append(str(start + offset))
+        return ".".join(reversed(parts))
+
+    def __iter__(self):
+        (a0, a1), (b0, b1), (c0, c1), (d0, d1) = self.octets
+        for a in range(a0, a1 + 1):
+            for b in range(b0, b1 + 1):
+                for c in range(c0, c1 + 1):
+                    for d in range(d0, d1 + 1):
+                        yield f"{a}.{b}.{c}.{d}"
+
+class _Hostname:
+    """Single hostname, resolved when it is scanned"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __len__(self):
+        return 1
+
+    def __getitem__(self, index):
+        return self.name
+
+    def __iter__(self):
+        yield self.name
+
+def _parse_octet(text):
+    """Parse one octet: N, A-B or *"""
+    if text == "*":
+        return 0, 255
+    if "-" in text:
+        start, end = (int(part) for part in text.split("-", 1))
+    else:
+        start = end = int(text)
+    if not (0 <= start <= 255 and 0 <= end <= 255):
+        raise ValueError(f"Octet invalide: {text}")
+    return min(start, end), max(start, end)
+
+def _parse_block(token):
+    """Parse one target token into a lazily expanded block"""
+    if "/" in token:
+        network = ipaddress.IPv4Network(token, strict=False)
+        return _AddressRange(int(network.network_address), int(network.broadcast_address))
+
+    if "-" in token and token.count(".") == 6:
+        # Full address range: 10.0.0.1-10.0.3.254
+        first, last = token.split("-", 1)
+        return _AddressRange(int(ipaddress.IPv4Address(first)), int(ipaddress.IPv4Address(last)))
+
+    parts = token.split(".")
+    if len(parts) == 4 and all(part == "*" or part.replace("-", "").isdigit() for part in parts):
+        if "-" in token or "*" in token:
+            return _OctetRange([_parse_octet(part) for part in parts])
+        return _AddressRange(int(ipaddress.IPv4Address(token)), int(ipaddress.IPv4Address(token)))
+
+    if not token.replace("-", "").replace(".", "").replace("_", "").isalnum():
+        raise ValueError(f"Cible invalide: {token}")
+    return _Hostname(token)
+
+class TargetSpec:
+    """
+    Lazily expanded set of scan targets.
+    len() and indexing are O(number of tokens), never O(number of
+    addresses), so /8 and larger specifications are cheap to plan.
+    """
+
+    def __init__(self, blocks=()):
+        self.blocks = []
+        self._offsets = []  # cumulative address count before each block
+        self._total = 0
+        for block in blocks:
+            self._append(block)
+
+    def _append(self, block):
+        self.blocks.append(block)
+        self._offsets.append(self._total)
+        self._total += len(block)
+
+    def add(self, text):
+        """Add targets from a comma, space or newline separated string"""
+        for token in text.replace(",", " ").split():
+            self._append(_parse_block(token))
+        return self
+
+    def add_file(self, path):
+        """Add targets from a file, one or more per line, '#' comments"""
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                self.add(line.split("#", 1)[0])
+        return self
+
+    @classmethod
+    def from_file(cls, path):
+        return cls().add_file(path)
+
+    def __len__(self):
+        return self._total
+
+    def __getitem__(self, index):
+        """Address at a position of the expanded sequence"""
+        if index < 0:
+            index += self._total
+        if not 0 <= index < self._total:
+            raise IndexError("Index de cible hors limites")
+        position = bisect.bisect_right(self._offsets, index) - 1
+        return self.blocks[position][index - self._offsets[position]]
+
+    def __iter__(self):
+        for block in self.blocks:
+            yield from block
+
+def parse_targets(text):
+    """
+    Parse a target specification into a TargetSpec.
+    Accepts CIDR blocks (10.0.0.0/8), octet ranges (192.168.1.1-254,
+    10.0.*.1), address ranges (10.0.0.1-10.0.0.50) and hostnames.
+    Raises ValueError on invalid input.
+    """
+    return TargetSpec().add(text)
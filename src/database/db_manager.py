@@ -6,7 +6,7 @@ Handles SQLite database operations for scan history and settings
 import sqlite3
 import os
 import json
-from datetime import datetime
+from datetime import datetime, date, timedelta
 
 class ScanDatabase:
     def __init__(self, db_path="output/scan_history.db"):
@@ -38,6 +38,77 @@ class ScanDatabase:
                     )
                 """)
                 
+                # History browsing walks scans newest first, per target or type
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_scans_timestamp ON scans (timestamp, id)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_scans_target ON scans (target, timestamp, id)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_scans_type ON scans (scan_type, timestamp, id)")
+                
+                # Open ports of each scan, one row per port and in history
+                # order, so that scans can be paged by open port without
+                # decoding their JSON
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'scan_open_ports'")
+                backfill = cursor.fetchone() is None
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS scan_open_ports (
+                        port INTEGER NOT NULL,
+                        timestamp TEXT NOT NULL,
+                        scan_id INTEGER NOT NULL,
+                        PRIMARY KEY (port, timestamp, scan_id)
+                    ) WITHOUT ROWID
+                """)
+                if backfill:
+                    rows = []
+                    for scan_id, timestamp, open_ports in cursor.execute(
+                            "SELECT id, timestamp, open_ports FROM scans").fetchall():
+                        try:
+                            ports = json.loads(open_ports or "[]")
+                        except ValueError:
+                            continue
+                        rows += [(port, timestamp, scan_id) for port in ports if isinstance(port, int)]
+                    cursor.executemany("""
+                        INSERT OR IGNORE INTO scan_open_ports (port, timestamp, scan_id) VALUES (?, ?, ?)
+                    """, rows)
+                
+                # Create checkpoints table for resuming interrupted scans
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS scan_checkpoints (
+                        scan_type TEXT NOT NULL,
+                        target TEXT NOT NULL,
+                        port_spec TEXT NOT NULL,
+                        seed INTEGER NOT NULL,
+                        total INTEGER NOT NULL,
+                        cursor INTEGER DEFAULT 0,
+                        scanned INTEGER DEFAULT 0,
+                        open_ports TEXT DEFAULT '[]',
+                        elapsed REAL DEFAULT 0.0,
+                        updated_at TEXT NOT NULL,
+                        PRIMARY KEY (scan_type, target, port_spec)
+                    )
+                """)
+                
+                # Create latency table for the continuous latency monitor
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS latency_stats (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        session TEXT NOT NULL,
+                        timestamp TEXT NOT NULL,
+                        host TEXT NOT NULL,
+                        sent INTEGER DEFAULT 0,
+                        received INTEGER DEFAULT 0,
+                        loss REAL DEFAULT 0.0,
+                        min_ms REAL,
+                        p50_ms REAL,
+                        p95_ms REAL,
+                        p99_ms REAL,
+                        max_ms REAL,
+                        jitter_ms REAL
+                    )
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_latency_session_host
+                    ON latency_stats (session, host, timestamp)
+                """)
+                
                 # Create settings table for themes and preferences
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS settings (
@@ -59,26 +130,170 @@ class ScanDatabase:
         """Save scan results to database"""
         try:
             with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                open_ports_json = json.dumps(open_ports_list or [])
-                timestamp = datetime.now().isoformat()
-                
-                cursor.execute("""
-                    INSERT INTO scans 
-                    (timestamp, scan_type, target, ports_scanned, ports_open, 
-                     open_ports, duration, results, status)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (timestamp, scan_type, target, ports_scanned, ports_open,
-                      open_ports_json, duration, results, status))
-                
+                scan_id = self._insert_scan(conn, scan_type, target, ports_scanned, ports_open,
+                                            open_ports_list, duration, results, status)
                 conn.commit()
-                return cursor.lastrowid
+                return scan_id
                 
         except Exception as e:
             print(f"Error saving scan: {e}")
             return None
     
+    def _insert_scan(self, conn, scan_type, target, ports_scanned, ports_open,
+                     open_ports_list, duration, results, status):
+        """Insert a scan and its open ports; returns the scan id"""
+        cursor = conn.cursor()
+        
+        open_ports_json = json.dumps(open_ports_list or [])
+        timestamp = datetime.now().isoformat()
+        
+        cursor.execute("""
+            INSERT INTO scans 
+            (timestamp, scan_type, target, ports_scanned, ports_open, 
+             open_ports, duration, results, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (timestamp, scan_type, target, ports_scanned, ports_open,
+              open_ports_json, duration, results, status))
+        scan_id = cursor.lastrowid
+        cursor.executemany("""
+            INSERT OR IGNORE INTO scan_open_ports (port, timestamp, scan_id) VALUES (?, ?, ?)
+        """, [(port, timestamp, scan_id) for port in open_ports_list or []])
+        return scan_id
+    
+    def save_port_scan(self, scan_type, target, port_spec, ports_scanned, open_ports_list,
+                       duration, status, checkpoint=None):
+        """
+        Save the (possibly partial) result of a port scan and settle its
+        checkpoint in the same transaction: `checkpoint` (a dict of
+        save_checkpoint() arguments: seed, total, cursor, elapsed) is kept
+        for a later resume, or the checkpoint is deleted when None.
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                scan_id = self._insert_scan(conn, scan_type, target, ports_scanned, len(open_ports_list),
+                                            open_ports_list, duration, "", status)
+                if checkpoint is not None:
+                    self._write_checkpoint(conn, scan_type, target, port_spec, checkpoint['seed'],
+                                           checkpoint['total'], checkpoint['cursor'], ports_scanned,
+                                           open_ports_list, checkpoint['elapsed'])
+                else:
+                    conn.execute("""
+                        DELETE FROM scan_checkpoints
+                        WHERE scan_type = ? AND target = ? AND port_spec = ?
+                    """, (scan_type, target, port_spec))
+                conn.commit()
+                return scan_id
+        except Exception as e:
+            print(f"Error saving port scan: {e}")
+            return None
+    
+    def save_checkpoint(self, scan_type, target, port_spec, seed, total, cursor,
+                        scanned=0, open_ports_list=None, elapsed=0.0):
+        """
+        Save (or replace) the progress of a running scan.
+        `cursor` is the position in the seeded probe order below which
+        every probe has completed.
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                self._write_checkpoint(conn, scan_type, target, port_spec, seed, total, cursor,
+                                       scanned, open_ports_list, elapsed)
+                conn.commit()
+                return True
+        except Exception as e:
+            print(f"Error saving checkpoint: {e}")
+            return False
+    
+    def _write_checkpoint(self, conn, scan_type, target, port_spec, seed, total, cursor,
+                          scanned, open_ports_list, elapsed):
+        conn.execute("""
+            INSERT OR REPLACE INTO scan_checkpoints
+            (scan_type, target, port_spec, seed, total, cursor,
+             scanned, open_ports, elapsed, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (scan_type, target, port_spec, seed, total, cursor, scanned,
+              json.dumps(open_ports_list or []), elapsed, datetime.now().isoformat()))
+    
+    def get_checkpoint(self, scan_type, target, port_spec):
+        """Get the saved progress of a scan, or None"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT * FROM scan_checkpoints
+                    WHERE scan_type = ? AND target = ? AND port_spec = ?
+                """, (scan_type, target, port_spec))
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+                columns = [description[0] for description in cursor.description]
+                checkpoint = dict(zip(columns, row))
+                checkpoint['open_ports'] = json.loads(checkpoint['open_ports'])
+                return checkpoint
+        except Exception as e:
+            print(f"Error getting checkpoint: {e}")
+            return None
+    
+    def delete_checkpoint(self, scan_type, target, port_spec):
+        """Delete the saved progress of a scan"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("""
+                    DELETE FROM scan_checkpoints
+                    WHERE scan_type = ? AND target = ? AND port_spec = ?
+                """, (scan_type, target, port_spec))
+                conn.commit()
+                return True
+        except Exception as e:
+            print(f"Error deleting checkpoint: {e}")
+            return False
+    
+    def save_latency_stats(self, session, snapshots):
+        """
+        Save one LatencySnapshot per host for a monitoring session
+        (identified by its start timestamp), in a single transaction.
+        """
+        def ms(value):
+            return None if value is None else value * 1000
+        
+        try:
+            timestamp = datetime.now().isoformat()
+            with sqlite3.connect(self.db_path) as conn:
+                conn.executemany("""
+                    INSERT INTO latency_stats
+                    (session, timestamp, host, sent, received, loss,
+                     min_ms, p50_ms, p95_ms, p99_ms, max_ms, jitter_ms)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, [(session, timestamp, snap.host, snap.sent, snap.received, snap.loss,
+                       ms(snap.min), ms(snap.p50), ms(snap.p95), ms(snap.p99), ms(snap.max),
+                       ms(snap.jitter)) for snap in snapshots])
+                conn.commit()
+                return True
+        except Exception as e:
+            print(f"Error saving latency stats: {e}")
+            return False
+    
+    def get_latency_stats(self, session, host=None):
+        """Get the saved latency statistics of a monitoring session"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                if host is None:
+                    cursor.execute("""
+                        SELECT * FROM latency_stats WHERE session = ?
+                        ORDER BY host, timestamp
+                    """, (session,))
+                else:
+                    cursor.execute("""
+                        SELECT * FROM latency_stats WHERE session = ? AND host = ?
+                        ORDER BY timestamp
+                    """, (session, host))
+                columns = [description[0] for description in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error getting latency stats: {e}")
+            return []
+    
     def get_scan_history(self, limit=50):
         """Get scan history from database"""
         try:
@@ -100,6 +315,76 @@ class ScanDatabase:
             print(f"Error getting scan history: {e}")
             return []
     
+    def get_scan_page(self, limit=50, after=None, target=None, scan_type=None,
+                      date_from=None, date_to=None, open_port=None):
+        """
+        Get one page of scan history, newest first, with keyset pagination:
+        `after` is the (timestamp, id) of the last row of the previous page.
+        target is an exact target, or a prefix when it ends with '*';
+        date_from/date_to are inclusive YYYY-MM-DD dates and open_port
+        keeps the scans that found it open. Pages are read in index order
+        rather than sorted, except for target prefixes.
+        """
+        if open_port is not None:
+            # Walk the open port's rows, already in history order
+            source = "scan_open_ports AS o JOIN scans AS s ON s.id = o.scan_id"
+            key = ("o.timestamp", "o.scan_id")
+            conditions = ["o.port = ?"]
+            params = [open_port]
+        else:
+            source = "scans AS s"
+            key = ("s.timestamp", "s.id")
+            conditions = []
+            params = []
+        if target and target.endswith("*"):
+            # Prefix range instead of LIKE so that idx_scans_target applies
+            conditions.append("s.target >= ? AND s.target < ?")
+            params += [target[:-1], target[:-1] + "\uffff"]
+        elif target:
+            conditions.append("s.target = ?")
+            params.append(target)
+        if scan_type:
+            conditions.append("s.scan_type = ?")
+            params.append(scan_type)
+        if date_from:
+            conditions.append(f"{key[0]} >= ?")
+            params.append(date.fromisoformat(date_from).isoformat())
+        if date_to:
+            conditions.append(f"{key[0]} < ?")
+            params.append((date.fromisoformat(date_to) + timedelta(days=1)).isoformat())
+        if after is not None:
+            conditions.append(f"({key[0]}, {key[1]}) < (?, ?)")
+            params += list(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT s.* FROM {source}
+                    {where}
+                    ORDER BY {key[0]} DESC, {key[1]} DESC
+                    LIMIT ?
+                """, params + [limit])
+                
+                columns = [description[0] for description in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+                
+        except Exception as e:
+            print(f"Error getting scan page: {e}")
+            return []
+    
+    def get_scan_types(self):
+        """Get the distinct scan types present in the history"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT DISTINCT scan_type FROM scans ORDER BY scan_type")
+                return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error getting scan types: {e}")
+            return []
+    
     def get_scan_statistics(self):
         """Get scan statistics"""
         try:
@@ -149,6 +434,7 @@ class ScanDatabase:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute("DELETE FROM scans")
+                cursor.execute("DELETE FROM scan_open_ports")
                 conn.commit()
                 return True
         except Exception as e:
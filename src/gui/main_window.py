@@ -8,21 +8,66 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import tkinter as tk
-from tkinter import ttk, scrolledtext, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox
 import threading
+import queue
 import time
+import asyncio
+from datetime import datetime
+import random
 from PIL import Image, ImageTk
 
-from src.core.scanner_engine import (port_scan, system_info, ip_lookup, ping_host, 
+from src.core.scanner_engine import (system_info, ip_lookup, ping_host, 
                                    wifi_scan, get_my_ip, whois_lookup, detect_service, 
-                                   fast_ping)
+                                   scan_events_async, get_fd_budget, set_max_rate,
+                                   format_banner, scan_udp_ports, sweep_hosts_async, get_local_ip, CancelToken,
+                                   monitor_latency_async)
+from src.core.port_set import PortSet, parse_port_spec
+from src.core.permutation import shuffled, CompletionCursor
+from src.core.targets import parse_targets
+from src.core.scan_stats import ScanStats
 from src.database.db_manager import ScanDatabase
+from src.gui.output_view import OutputLog, VirtualOutput, FILTER_ALL, FILTER_OPEN
+
+# Maximum number of TCP connects kept in flight during a port scan
+SCAN_CONCURRENCY = 500
+
+# Seconds between two progress checkpoints of a running port scan
+CHECKPOINT_INTERVAL = 5.0
+
+# Default wait for a UDP answer (adaptive speed), per transmission
+UDP_TIMEOUT = 1.0
+
+# Latency monitor: seconds between probe rounds, between two tables
+# written to the output and between two saves to the database
+MONITOR_INTERVAL = 1.0
+MONITOR_REPORT_INTERVAL = 5.0
+MONITOR_DB_INTERVAL = 10.0
+MONITOR_MAX_HOSTS = 1024
+
+# Worker threads never touch Tk widgets: they queue their output and the
+# main loop applies it every UI_REFRESH_MS milliseconds in one batch
+UI_REFRESH_MS = 50
+UI_MAX_EVENTS_PER_REFRESH = 5000
+
+# Milliseconds between two refreshes of the live scan statistics
+DASHBOARD_REFRESH_MS = 500
+
+# Scans shown per page of the history window
+HISTORY_PAGE_SIZE = 50
 
 class CyberScannerPRO:
     def __init__(self):
         # Initialize database
         self.db = ScanDatabase()
         
+        # Raise RLIMIT_NOFILE and size the socket budget before any scan
+        get_fd_budget()
+        
+        # Output, progress and widget updates queued by worker threads
+        self.ui_queue = queue.SimpleQueue()
+        self.pending_progress = None
+        
         # Load theme preference (force dark mode)
         self.current_theme = 'dark'
         
@@ -312,6 +357,7 @@ class CyberScannerPRO:
         self.setup_output_area()
         self.setup_save_section()
         
+        self.root.after(UI_REFRESH_MS, self.process_ui_queue)
         self.root.mainloop()
     
     def setup_header(self):
@@ -383,7 +429,7 @@ class CyberScannerPRO:
         ports_frame = tk.Frame(content_frame, bg=self.get_theme_color('bg'))
         ports_frame.pack(fill="x", pady=(0, 20))
         
-        tk.Label(ports_frame, text="Ports (start-end ou liste, ex: 1-1024 ou 22,80,443):", 
+        tk.Label(ports_frame, text="Ports (plages, listes, groupes et exclusions, ex: 22,80,8000-9000,web,!8080):", 
                 font=("Segoe UI", 10), bg=self.get_theme_color('bg'), fg=self.get_theme_color('text_secondary')).pack(anchor="w", pady=(0, 6))
         
         self.ports_entry = tk.Entry(ports_frame, font=("Segoe UI", 11), 
@@ -410,12 +456,38 @@ class CyberScannerPRO:
         tk.Label(speed_frame, text="Vitesse de scan:", 
                 font=("Segoe UI", 9), bg=self.get_theme_color('bg'), fg=self.get_theme_color('text_secondary')).pack(side="left", padx=(0, 10))
         
-        self.speed_var = tk.StringVar(value="Normal")
-        speed_options = ["Rapide (0.1s)", "Normal (0.5s)", "Lent (1.0s)", "Très Lent (2.0s)"]
+        self.speed_var = tk.StringVar(value="Adaptatif (RTT)")
+        speed_options = ["Adaptatif (RTT)", "Rapide (0.1s)", "Normal (0.5s)", "Lent (1.0s)", "Très Lent (2.0s)"]
         speed_combo = ttk.Combobox(speed_frame, textvariable=self.speed_var, 
                                   values=speed_options, state="readonly", width=15)
         speed_combo.pack(side="left")
         
+        # Probe send-rate limit shared by all scans
+        tk.Label(speed_frame, text="Débit max:", 
+                font=("Segoe UI", 9), bg=self.get_theme_color('bg'), fg=self.get_theme_color('text_secondary')).pack(side="left", padx=(20, 10))
+        
+        self.rate_var = tk.StringVar(value="Illimité")
+        rate_options = ["Illimité", "100 sondes/s", "1000 sondes/s", "10000 sondes/s", "50000 sondes/s"]
+        rate_combo = ttk.Combobox(speed_frame, textvariable=self.rate_var, 
+                                 values=rate_options, state="readonly", width=15)
+        rate_combo.pack(side="left")
+        
+        # TCP connect scan or UDP scan with protocol payloads
+        tk.Label(speed_frame, text="Protocole:", 
+                font=("Segoe UI", 9), bg=self.get_theme_color('bg'), fg=self.get_theme_color('text_secondary')).pack(side="left", padx=(20, 10))
+        
+        self.protocol_var = tk.StringVar(value="TCP")
+        protocol_combo = ttk.Combobox(speed_frame, textvariable=self.protocol_var, 
+                                     values=["TCP", "UDP"], state="readonly", width=6)
+        protocol_combo.pack(side="left")
+        
+        # Read service banners on the sockets that found open ports
+        self.banner_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(speed_frame, text="Capturer les bannières", variable=self.banner_var,
+                      font=("Segoe UI", 9), bg=self.get_theme_color('bg'), fg=self.get_theme_color('text_secondary'),
+                      selectcolor=self.get_theme_color('secondary_bg'),
+                      activebackground=self.get_theme_color('bg')).pack(side="left", padx=(20, 0))
+        
         # Main action buttons
         main_buttons_frame = tk.Frame(buttons_frame, bg=self.get_theme_color('bg'))
         main_buttons_frame.pack(fill="x", pady=(10, 0))
@@ -423,7 +495,9 @@ class CyberScannerPRO:
         # Configuration des boutons
         buttons = [
             ("🔍 Scanner Ports", self.start_port_scan, "#4a9eff"),
+            ("🛰️ Découverte Réseau", self.start_network_discovery, "#10b981"),
             (" Test Ping", self.start_ping, "#f59e0b"),
+            ("📈 Surveillance Latence", self.start_latency_monitor, "#14b8a6"),
             ("🌐 Géolocalisation IP", self.start_ip_lookup, "#8b5cf6"),
             ("📋 Recherche WHOIS", self.start_whois_lookup, "#f97316"),
             ("📶 Analyse WiFi", self.start_wifi_scan, "#9333ea"),
@@ -451,9 +525,9 @@ class CyberScannerPRO:
         control_frame = tk.Frame(parent, bg=self.get_theme_color('bg'))
         control_frame.pack(fill="x", pady=(5, 15))
         
-        # Scan control variables
+        # Scan control variables: the token of the running scan aborts it
         self.is_scanning = False
-        self.stop_scan = False
+        self.cancel_token = CancelToken()
         
         # Boutons de contrôle
         control_buttons = [
@@ -493,6 +567,13 @@ class CyberScannerPRO:
                                        style='Modern.Horizontal.TProgressbar')
         self.progress.pack(fill="x")
         
+        # Live statistics of the running scan
+        self.scan_stats = None
+        self.stats_var = tk.StringVar(value="")
+        tk.Label(progress_frame, textvariable=self.stats_var, font=("Consolas", 9),
+                bg=self.get_theme_color('bg'), fg=self.get_theme_color('text_muted'),
+                anchor="w").pack(fill="x", pady=(6, 0))
+        
         # Style the progress bar
         style = ttk.Style()
         style.configure('Modern.Horizontal.TProgressbar',
@@ -506,8 +587,30 @@ class CyberScannerPRO:
         output_frame = tk.Frame(self.root, bg=self.get_theme_color('bg'))
         output_frame.pack(fill="both", expand=True, padx=30, pady=(0, 15))
         
-        self.output = scrolledtext.ScrolledText(
+        # Output filters
+        filter_frame = tk.Frame(output_frame, bg=self.get_theme_color('bg'))
+        filter_frame.pack(fill="x", pady=(0, 6))
+        
+        tk.Label(filter_frame, text="Afficher:", font=("Segoe UI", 9),
+                bg=self.get_theme_color('bg'), fg=self.get_theme_color('text_secondary')).pack(side="left", padx=(0, 6))
+        self.output_filter_var = tk.StringVar(value=FILTER_ALL)
+        filter_combo = ttk.Combobox(filter_frame, textvariable=self.output_filter_var,
+                                    values=[FILTER_ALL, FILTER_OPEN], state="readonly", width=14)
+        filter_combo.pack(side="left", padx=(0, 15))
+        filter_combo.bind("<<ComboboxSelected>>", self.apply_output_filter)
+        
+        tk.Label(filter_frame, text="Service:", font=("Segoe UI", 9),
+                bg=self.get_theme_color('bg'), fg=self.get_theme_color('text_secondary')).pack(side="left", padx=(0, 6))
+        self.service_filter_entry = tk.Entry(filter_frame, font=("Segoe UI", 9), width=20,
+                                             bg=self.get_theme_color('secondary_bg'), fg=self.get_theme_color('text'),
+                                             insertbackground=self.get_theme_color('accent'), bd=0, relief="flat")
+        self.service_filter_entry.pack(side="left", ipady=4)
+        self.service_filter_entry.bind("<KeyRelease>", self.apply_output_filter)
+        
+        # Only the visible lines are in the widget, the rest stays in a ring buffer
+        self.output = VirtualOutput(
             output_frame,
+            OutputLog(),
             font=("Consolas", 10),
             bg=self.get_theme_color('output_bg'),
             fg=self.get_theme_color('text'),
@@ -515,12 +618,16 @@ class CyberScannerPRO:
             selectbackground=self.get_theme_color('secondary_bg'),
             bd=0,
             relief="flat",
-            wrap=tk.WORD,
             padx=15,
             pady=15
         )
         self.output.pack(fill="both", expand=True)
     
+    def apply_output_filter(self, event=None):
+        """Filter the output area on open ports and/or a service name"""
+        self.output.set_filter(open_only=self.output_filter_var.get() == FILTER_OPEN,
+                               service=self.service_filter_entry.get())
+    
     def setup_save_section(self):
         """Setup save file section"""
         save_frame = tk.Frame(self.root, bg=self.get_theme_color('bg'))
@@ -555,46 +662,91 @@ class CyberScannerPRO:
                               activeforeground=self.get_theme_color('text'))
         browse_btn.pack(side="right", ipady=8)
     
-    def write_output(self, text):
-        """Write text to output area"""
-        self.output.insert(tk.END, text + "\n")
-        self.output.see(tk.END)
-        self.root.update_idletasks()
+    def write_output(self, text, service=None):
+        """
+        Write text to output area (queued, safe from any thread).
+        service marks the line as an open port result for the filters.
+        """
+        for line in str(text).split("\n"):
+            self.ui_queue.put(("text", (line, service)))
     
     def clear_output(self):
-        """Clear output area"""
-        self.output.delete(1.0, tk.END)
+        """Clear output area (queued, safe from any thread)"""
+        self.ui_queue.put(("clear", None))
     
-    def parse_ports(self, text):
-        """Parse ports from text input"""
-        text = text.strip()
-        if "-" in text:
-            try:
-                start, end = text.split("-", 1)
-                start, end = int(start.strip()), int(end.strip())
-                if start > end:
-                    start, end = end, start
-                return list(range(start, end + 1))
-            except:
-                return []
-        elif "," in text:
-            ports = []
-            for part in text.split(","):
+    def set_progress(self, value):
+        """Set the progress bar (safe from any thread), applied once per refresh"""
+        self.pending_progress = value
+    
+    def run_in_ui(self, callback):
+        """Run a callable in the Tk main loop (safe from any thread)"""
+        self.ui_queue.put(("call", callback))
+    
+    def process_ui_queue(self):
+        """Apply the queued worker events: one text insert and one progress update per refresh"""
+        try:
+            lines = []
+            for _ in range(UI_MAX_EVENTS_PER_REFRESH):
                 try:
-                    ports.append(int(part.strip()))
-                except:
-                    pass
-            return ports
-        else:
-            try:
-                return [int(text)]
-            except:
-                return []
+                    kind, payload = self.ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "text":
+                    lines.append(payload)
+                    continue
+                # Keep the order of text and other events
+                self.flush_output(lines)
+                lines = []
+                if kind == "clear":
+                    self.output.clear()
+                    continue
+                try:
+                    payload()
+                except Exception as e:
+                    # A failing callback must not stop the queue
+                    print(f"Erreur UI: {e}")
+            self.flush_output(lines)
+            
+            progress, self.pending_progress = self.pending_progress, None
+            if progress is not None:
+                self.progress['value'] = progress
+        finally:
+            self.root.after(UI_REFRESH_MS, self.process_ui_queue)
+    
+    def flush_output(self, lines):
+        """Insert a batch of lines at the end of the output area"""
+        if lines:
+            self.output.append(lines)
+    
+    def update_scan_dashboard(self, stats):
+        """Show the throughput, latency, error rates and ETA of a running scan"""
+        snapshot = stats.snapshot()
+        
+        def ms(value):
+            return "-" if value is None else f"{value * 1000:.1f} ms"
+        
+        eta = "-" if snapshot.eta is None else time.strftime("%H:%M:%S", time.gmtime(snapshot.eta))
+        self.stats_var.set(
+            f"⚡ {snapshot.rate:,.0f} sondes/s | En vol: {snapshot.in_flight}/{snapshot.window} | "
+            f"Latence p50: {ms(snapshot.p50)} p99: {ms(snapshot.p99)} | "
+            f"Délais: {snapshot.timeout_rate:.1f}% | Erreurs: {snapshot.error_rate:.1f}% | Restant: {eta}")
+        # The last refresh after the scan ends shows its final figures
+        if self.is_scanning and self.scan_stats is stats:
+            self.root.after(DASHBOARD_REFRESH_MS, self.update_scan_dashboard, stats)
+    
+    def parse_ports(self, text):
+        """Parse ports from text input into a PortSet (empty if invalid)"""
+        try:
+            return parse_port_spec(text)
+        except ValueError:
+            return PortSet()
     
     def get_scan_timeout(self):
-        """Get timeout based on selected speed"""
+        """Get timeout based on selected speed (None = adaptive from RTT)"""
         speed = self.speed_var.get()
-        if "Rapide" in speed:
+        if "Adaptatif" in speed:
+            return None
+        elif "Rapide" in speed:
             return 0.1
         elif "Normal" in speed:
             return 0.5
@@ -603,6 +755,11 @@ class CyberScannerPRO:
         else:  # Très lent
             return 2.0
     
+    def get_max_rate(self):
+        """Get probe rate limit in probes/s (None = unlimited)"""
+        rate = self.rate_var.get().split()[0]
+        return int(rate) if rate.isdigit() else None
+    
     def browse_save_file(self):
         """Browse for save file location"""
         # Set initial directory to output folder
@@ -638,85 +795,179 @@ class CyberScannerPRO:
         
         # Activer le bouton d'arrêt
         self.is_scanning = True
-        self.stop_scan = False
+        self.cancel_token = cancel = CancelToken()
         if hasattr(self, 'stop_btn'):
             self.stop_btn.config(state="normal")
         
         self.clear_output()
         timeout = self.get_scan_timeout()
-        self.write_output(f"🔍 Analyse des ports en cours sur {target} ({len(ports)} ports)...")
-        self.write_output(f"⚙️ Vitesse d'analyse: {self.speed_var.get()} (délai: {timeout}s)")
+        protocol = self.protocol_var.get().lower()
+        self.write_output(f"🔍 Analyse des ports {protocol.upper()} en cours sur {target} ({len(ports)} ports)...")
+        timeout_text = "adaptatif" if timeout is None else f"{timeout}s"
+        set_max_rate(self.get_max_rate())
+        self.write_output(f"⚙️ Vitesse d'analyse: {self.speed_var.get()} (délai: {timeout_text}, débit max: {self.rate_var.get()})")
         self.write_output("=" * 60)
         
+        # Seeded pseudo-random probe order spreads load over the port range;
+        # an interrupted scan of the same target and ports can resume it
+        scan_type = "Analyse de Ports UDP" if protocol == "udp" else "Analyse de Ports"
+        port_spec = ports.to_spec()
+        port_list = list(ports)
+        scan_seed = random.getrandbits(32)
+        grab_banners = self.banner_var.get()
+        resume = self.db.get_checkpoint(scan_type, target, port_spec)
+        if resume and not messagebox.askyesno(
+                "Reprendre l'analyse",
+                f"Une analyse interrompue de {target} a été trouvée "
+                f"({resume['cursor']}/{resume['total']} ports).\n\nVoulez-vous la reprendre?"):
+            self.db.delete_checkpoint(scan_type, target, port_spec)
+            resume = None
+        if resume:
+            scan_seed = resume['seed']
+            self.write_output(f"⏩ Reprise de l'analyse à la position {resume['cursor']}/{resume['total']}")
+        
+        # Engine counters behind the live statistics line
+        stats = ScanStats(total=len(port_list) - (resume['cursor'] if resume else 0))
+        
         def scan_worker():
             start_time = time.time()
-            open_ports = []
-            total = len(ports)
+            elapsed_before = resume['elapsed'] if resume else 0.0
+            open_ports = [(port, detect_service(port, protocol=protocol)) for port in resume['open_ports']] if resume else []
+            total = len(port_list)
+            # Probes past the cursor are redone, so only count those before it
+            scanned = resume['cursor'] if resume else 0
+            cursor = CompletionCursor(resume['cursor'] if resume else 0)
+            interrupted = False
             
-            for i, port in enumerate(ports):
-                # Check for stop request more frequently
-                if self.stop_scan:
-                    self.write_output("🛑 Analyse interrompue par l'utilisateur")
-                    break
-                    
+            def checkpoint():
+                return {'seed': scan_seed, 'total': total, 'cursor': cursor.position,
+                        'elapsed': elapsed_before + time.time() - start_time}
+            
+            def save_checkpoint():
+                state = checkpoint()
+                self.db.save_checkpoint(scan_type, target, port_spec, state['seed'], state['total'],
+                                        state['cursor'], scanned, [p[0] for p in open_ports], state['elapsed'])
+            
+            # Positions of each port in the probe order, for the cursor
+            positions = {}
+            def probe_order():
+                for position, port in enumerate(shuffled(port_list, seed=scan_seed, start=cursor.position),
+                                                start=cursor.position):
+                    positions[port] = position
+                    yield port
+            
+            already_open = {port for port, _ in open_ports}
+            unanswered = 0  # UDP ports that stayed silent (open|filtered)
+            last_checkpoint = time.time()
+            
+            def handle_event(event):
+                """Record one probe result; returns True when the scan must stop"""
+                nonlocal scanned, interrupted, last_checkpoint, unanswered
+                scanned += 1
+                cursor.complete(positions.pop(event.port))
+                if event.state == "open|filtered":
+                    unanswered += 1
+                if event.state == "open" and event.port not in already_open:
+                    banner = format_banner(event.banner)
+                    banner_text = f" | {banner}" if banner else ""
+                    self.write_output(f"✅ Port {event.port:5d} | OUVERT | {event.service}{banner_text}",
+                                      service=event.service)
+                    open_ports.append((event.port, event.service))
+                
+                # Update progress and check for stop request
+                self.set_progress(scanned / total * 100)
+                if cancel.cancelled:
+                    return True
+                
+                # Periodic checkpoint so a crash does not lose the scan
+                if time.time() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                    save_checkpoint()
+                    last_checkpoint = time.time()
+                return False
+            
+            async def run_scan():
+                scan = scan_events_async(target, probe_order(), concurrency=SCAN_CONCURRENCY, timeout=timeout,
+                                         grab_banners=grab_banners, stats=stats, cancel=cancel)
                 try:
-                    if port_scan(target, port, timeout=timeout):
-                        service = detect_service(port)
-                        self.write_output(f"✅ Port {port:5d} | OUVERT | {service}")
-                        open_ports.append((port, service))
-                    
-                    # Update progress and check for stop again
-                    progress_val = (i + 1) / total * 100
-                    self.progress['value'] = progress_val
-                    
-                    # Force GUI update and check stop condition
-                    self.root.update_idletasks()
-                    if self.stop_scan:
-                        self.write_output("🛑 Analyse interrompue par l'utilisateur")
-                        break
-                    
-                except Exception as e:
-                    if not self.stop_scan:  # Only show errors if not stopping
-                        self.write_output(f"⚠️  Port {port:5d} | Erreur: {str(e)}")
+                    async for event in scan:
+                        if handle_event(event):
+                            break
+                finally:
+                    await scan.aclose()
+            
+            def run_udp_scan():
+                # Silent UDP ports need a longer wait than TCP handshakes
+                scan = scan_udp_ports(target, probe_order(), timeout=timeout or UDP_TIMEOUT, stats=stats,
+                                      cancel=cancel)
+                try:
+                    for event in scan:
+                        if handle_event(event):
+                            break
+                finally:
+                    scan.close()
+            
+            try:
+                if protocol == "udp":
+                    run_udp_scan()
+                else:
+                    asyncio.run(run_scan())
+            except Exception as e:
+                interrupted = True
+                self.write_output(f"⚠️  Erreur d'analyse: {str(e)}")
+            if cancel.cancelled:
+                # Probes in flight were aborted: only completed ones are counted
+                interrupted = True
+                self.write_output("🛑 Analyse interrompue par l'utilisateur")
+            
+            # Results arrive in completion order
+            open_ports.sort()
             
             # Résumé des résultats
             self.write_output("=" * 60)
             self.write_output(f"📊 RÉSULTATS DE L'ANALYSE DES PORTS")
             self.write_output(f"   Cible analysée: {target}")
-            self.write_output(f"   Ports analysés: {i+1 if not self.stop_scan else len(ports)}")
+            self.write_output(f"   Ports analysés: {scanned}")
             self.write_output(f"   Ports ouverts détectés: {len(open_ports)}")
+            if protocol == "udp":
+                self.write_output(f"   Ports sans réponse (ouverts|filtrés): {unanswered}")
             
             if open_ports:
                 self.write_output(f"\n🎯 PORTS OUVERTS DÉTECTÉS:")
                 for port, service in open_ports:
                     self.write_output(f"   ✅ Port {port} | {service}")
             
-            # Reset scan state
-            self.is_scanning = False
-            self.stop_scan = False
-            if hasattr(self, 'stop_btn'):
-                self.stop_btn.config(state="disabled", text="⏹️ Arrêter Scan")
+            # A scan that failed before completing any probe (e.g. unresolvable
+            # target) has nothing to resume: its checkpoint row is deleted
+            resumable = interrupted and (cancel.cancelled or cursor.position > 0)
             
-            # Sauvegarder dans la base de données
-            open_ports_simple = [p[0] for p in open_ports]
-            self.db.save_scan(
-                scan_type="Analyse de Ports",
+            # Sauvegarder dans la base de données: the partial result and the
+            # checkpoint of an interrupted scan are committed together
+            self.db.save_port_scan(
+                scan_type=scan_type,
                 target=target,
-                ports_scanned=i+1 if not self.stop_scan else len(ports),
-                ports_open=len(open_ports),
-                open_ports_list=open_ports_simple,
-                duration=time.time() - start_time,
-                status="interrompu" if self.stop_scan else "terminé"
+                port_spec=port_spec,
+                ports_scanned=scanned,
+                open_ports_list=[p[0] for p in open_ports],
+                duration=elapsed_before + time.time() - start_time,
+                status="interrompu" if interrupted else "terminé",
+                checkpoint=checkpoint() if resumable else None
             )
             
+            # Reset scan state
+            self.is_scanning = False
+            if hasattr(self, 'stop_btn'):
+                self.run_in_ui(lambda: self.stop_btn.config(state="disabled", text="⏹️ Arrêter Scan"))
+            
             # Auto-save results
-            self.auto_save_results(target, open_ports, ports_text)
+            self.auto_save_results(target, open_ports, ports_text, save_path)
         
+        save_path = self.save_path_var.get()
         threading.Thread(target=scan_worker, daemon=True).start()
+        self.scan_stats = stats
+        self.update_scan_dashboard(stats)
     
-    def auto_save_results(self, target, open_ports, ports_text):
-        """Auto-save scan results to file"""
-        save_path = self.save_path_var.get()
+    def auto_save_results(self, target, open_ports, ports_text, save_path):
+        """Auto-save scan results to file (save_path is read on the UI thread)"""
         if save_path:
             try:
                 os.makedirs(os.path.dirname(save_path), exist_ok=True)
@@ -740,6 +991,181 @@ class CyberScannerPRO:
             except Exception as e:
                 self.write_output(f"⚠️  Erreur de sauvegarde: {str(e)}")
     
+    def start_network_discovery(self):
+        """Find the live hosts of a target range in a separate thread"""
+        if self.is_scanning:
+            messagebox.showwarning("Scan en cours", "Un scan est déjà en cours. Utilisez 'Arrêter Scan' pour l'interrompre.")
+            return
+        
+        target = self.ip_entry.get().strip()
+        if not target:
+            # Default to the local /24 network
+            network_base = '.'.join(get_local_ip().split('.')[:-1])
+            target = f"{network_base}.1-254"
+            self.ip_entry.insert(0, target)
+        try:
+            hosts = parse_targets(target)
+        except ValueError as e:
+            messagebox.showerror("Erreur", f"Plage de cibles non valide: {e}")
+            return
+        if not len(hosts):
+            messagebox.showerror("Erreur", "Veuillez saisir une plage d'adresses (ex: 192.168.1.0/24)")
+            return
+        
+        self.is_scanning = True
+        self.cancel_token = cancel = CancelToken()
+        if hasattr(self, 'stop_btn'):
+            self.stop_btn.config(state="normal")
+        
+        self.clear_output()
+        timeout = self.get_scan_timeout() or 1.0
+        set_max_rate(self.get_max_rate())
+        self.write_output(f"🛰️ Découverte réseau en cours sur {target} ({len(hosts)} hôtes)...")
+        self.write_output("=" * 60)
+        
+        def discovery_worker():
+            start_time = time.time()
+            alive_hosts = []
+            checked = 0
+            interrupted = False
+            
+            async def run_sweep():
+                nonlocal checked, interrupted
+                sweep = sweep_hosts_async(hosts, timeout=timeout, cancel=cancel)
+                try:
+                    async for host, alive in sweep:
+                        checked += 1
+                        if alive:
+                            self.write_output(f"✅ {host} | ACTIF")
+                            alive_hosts.append(host)
+                        self.set_progress(checked / len(hosts) * 100)
+                        if cancel.cancelled:
+                            break
+                finally:
+                    await sweep.aclose()
+            
+            try:
+                asyncio.run(run_sweep())
+            except Exception as e:
+                interrupted = True
+                self.write_output(f"⚠️  Erreur de découverte: {str(e)}")
+            if cancel.cancelled:
+                interrupted = True
+                self.write_output("🛑 Découverte interrompue par l'utilisateur")
+            
+            self.write_output("=" * 60)
+            self.write_output(f"📊 Découverte terminée")
+            self.write_output(f"   Hôtes testés: {checked}")
+            self.write_output(f"   Hôtes actifs: {len(alive_hosts)}")
+            
+            self.db.save_scan(
+                scan_type="Découverte Réseau",
+                target=target,
+                ports_scanned=checked,
+                ports_open=len(alive_hosts),
+                duration=time.time() - start_time,
+                results="\n".join(alive_hosts),
+                status="interrompu" if interrupted else "terminé"
+            )
+            
+            self.is_scanning = False
+            if hasattr(self, 'stop_btn'):
+                self.run_in_ui(lambda: self.stop_btn.config(state="disabled", text="⏹️ Arrêter Scan"))
+        
+        threading.Thread(target=discovery_worker, daemon=True).start()
+    
+    def start_latency_monitor(self):
+        """Probe the target hosts continuously until the scan is stopped"""
+        if self.is_scanning:
+            messagebox.showwarning("Scan en cours", "Un scan est déjà en cours. Utilisez 'Arrêter Scan' pour l'interrompre.")
+            return
+        
+        target = self.ip_entry.get().strip()
+        if not target:
+            messagebox.showerror("Erreur", "Veuillez saisir une ou plusieurs adresses à surveiller")
+            return
+        try:
+            hosts = parse_targets(target)
+        except ValueError as e:
+            messagebox.showerror("Erreur", f"Cibles non valides: {e}")
+            return
+        if not 0 < len(hosts) <= MONITOR_MAX_HOSTS:
+            messagebox.showerror("Erreur", f"La surveillance accepte de 1 à {MONITOR_MAX_HOSTS} hôtes")
+            return
+        
+        self.is_scanning = True
+        self.cancel_token = cancel = CancelToken()
+        if hasattr(self, 'stop_btn'):
+            self.stop_btn.config(state="normal")
+        
+        self.clear_output()
+        timeout = min(self.get_scan_timeout() or 1.0, MONITOR_INTERVAL)
+        self.write_output(f"📈 Surveillance de la latence de {target} ({len(hosts)} hôtes, "
+                          f"une sonde toutes les {MONITOR_INTERVAL:g}s)...")
+        self.write_output("   Cliquez sur 'Arrêter Scan' pour terminer la surveillance")
+        self.write_output("=" * 60)
+        
+        def ms(value):
+            return "-" if value is None else f"{value * 1000:.2f}"
+        
+        def write_table(snapshots):
+            self.write_output(f"🕒 {time.strftime('%H:%M:%S')}")
+            self.write_output(f"   {'Hôte':<18} {'Envoyés':>8} {'Perte':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'Gigue':>8}  (ms)")
+            for snap in snapshots:
+                self.write_output(f"   {snap.host:<18} {snap.sent:>8} {snap.loss:>6.1f}% {ms(snap.p50):>8} "
+                                  f"{ms(snap.p95):>8} {ms(snap.p99):>8} {ms(snap.jitter):>8}")
+        
+        def monitor_worker():
+            start_time = time.time()
+            session = datetime.now().isoformat()
+            snapshots = []
+            
+            async def run_monitor():
+                nonlocal snapshots
+                last_report = last_save = time.time()
+                monitor = monitor_latency_async(hosts, interval=MONITOR_INTERVAL, timeout=timeout,
+                                                cancel=cancel)
+                try:
+                    async for snapshots in monitor:
+                        if cancel.cancelled:
+                            break
+                        if time.time() - last_report >= MONITOR_REPORT_INTERVAL:
+                            write_table(snapshots)
+                            last_report = time.time()
+                        if time.time() - last_save >= MONITOR_DB_INTERVAL:
+                            self.db.save_latency_stats(session, snapshots)
+                            last_save = time.time()
+                finally:
+                    await monitor.aclose()
+            
+            try:
+                asyncio.run(run_monitor())
+            except Exception as e:
+                self.write_output(f"⚠️  Erreur de surveillance: {str(e)}")
+            
+            self.write_output("=" * 60)
+            self.write_output("📊 BILAN DE LA SURVEILLANCE")
+            if snapshots:
+                write_table(snapshots)
+                self.db.save_latency_stats(session, snapshots)
+            
+            reachable = sum(1 for snap in snapshots if snap.received)
+            self.db.save_scan(
+                scan_type="Surveillance Latence",
+                target=target,
+                ports_scanned=len(hosts),
+                ports_open=reachable,
+                duration=time.time() - start_time,
+                results=f"session={session}",
+                status="terminé"
+            )
+            
+            self.is_scanning = False
+            if hasattr(self, 'stop_btn'):
+                self.run_in_ui(lambda: self.stop_btn.config(state="disabled", text="⏹️ Arrêter Scan"))
+        
+        threading.Thread(target=monitor_worker, daemon=True).start()
+    
     def start_ping(self):
         """Démarrer le ping dans un thread séparé"""
         target = self.ip_entry.get().strip()
@@ -835,25 +1261,28 @@ class CyberScannerPRO:
                 my_ip = get_my_ip()
                 
                 if my_ip:
-                    self.root.clipboard_clear()
-                    self.root.clipboard_append(my_ip)
-                    self.root.update()
-                    
-                    self.ip_entry.delete(0, tk.END)
-                    self.ip_entry.insert(0, my_ip)
+                    def show_ip():
+                        self.root.clipboard_clear()
+                        self.root.clipboard_append(my_ip)
+                        
+                        self.ip_entry.delete(0, tk.END)
+                        self.ip_entry.insert(0, my_ip)
+                        
+                        messagebox.showinfo("IP Récupérée", 
+                                          f"Votre IP: {my_ip}\n\n✅ Copiée dans le presse-papiers")
                     
                     self.write_output(f"✅ Votre IP publique: {my_ip}")
                     self.write_output("📋 IP copiée dans le presse-papiers et ajoutée au champ IP")
-                    
-                    messagebox.showinfo("IP Récupérée", 
-                                      f"Votre IP: {my_ip}\n\n✅ Copiée dans le presse-papiers")
+                    self.run_in_ui(show_ip)
                 else:
                     self.write_output("❌ Impossible de récupérer votre IP publique")
-                    messagebox.showerror("Erreur", "Impossible de récupérer votre IP")
+                    self.run_in_ui(lambda: messagebox.showerror("Erreur", "Impossible de récupérer votre IP"))
                     
             except Exception as e:
-                self.write_output(f"⚠️  Erreur: {str(e)}")
-                messagebox.showerror("Erreur", f"Erreur: {str(e)}")
+                # `e` is unbound once the except block ends: keep the message
+                message = f"Erreur: {str(e)}"
+                self.write_output(f"⚠️  {message}")
+                self.run_in_ui(lambda: messagebox.showerror("Erreur", message))
         
         threading.Thread(target=ip_worker, daemon=True).start()
     
@@ -861,23 +1290,20 @@ class CyberScannerPRO:
     def stop_current_scan(self):
         """Arrêter l'analyse en cours"""
         if self.is_scanning:
-            self.stop_scan = True
-            self.write_output("🛑 Demande d'interruption envoyée... Veuillez patienter.")
-            self.write_output("⏳ Arrêt de l'analyse en cours...")
+            # Aborts the probes in flight at once; the worker then saves the
+            # partial results and resets the stop button itself
+            self.cancel_token.cancel()
+            self.write_output("🛑 Demande d'interruption envoyée...")
             
-            # Désactiver temporairement le bouton d'arrêt pour éviter les clics multiples
+            # Désactiver le bouton d'arrêt jusqu'à la fin de l'analyse
             if hasattr(self, 'stop_btn'):
                 self.stop_btn.config(state="disabled", text="⏳ Arrêt en cours...")
-                # Réactiver après un court délai
-                self.root.after(2000, lambda: (
-                    self.stop_btn.config(state="normal", text="⏹️ Arrêter Scan") if hasattr(self, 'stop_btn') else None
-                ))
         else:
             messagebox.showinfo("Information", "Aucune analyse en cours d'exécution")
     
     def export_results(self):
         """Exporter les résultats actuels vers un fichier"""
-        content = self.output.get(1.0, tk.END).strip()
+        content = self.output.log.text().strip()
         if not content:
             messagebox.showwarning("Attention", "Aucun résultat disponible pour l'exportation")
             return
@@ -959,6 +1385,61 @@ class CyberScannerPRO:
                               width=16, height=1)
         export_btn.pack(side="left")
         
+        # Search filters (each one is served by an index of the scans table)
+        filter_frame = tk.Frame(header_frame, bg=self.get_theme_color('bg'))
+        filter_frame.pack(fill="x", pady=(10, 0))
+        
+        def filter_label(text):
+            tk.Label(filter_frame, text=text, font=("Segoe UI", 9),
+                    bg=self.get_theme_color('bg'), fg=self.get_theme_color('text_secondary')).pack(side="left", padx=(0, 4))
+        
+        def filter_entry(width):
+            entry = tk.Entry(filter_frame, font=("Segoe UI", 9), width=width,
+                             bg=self.get_theme_color('secondary_bg'), fg=self.get_theme_color('text'),
+                             insertbackground=self.get_theme_color('accent'), bd=0, relief="flat")
+            entry.pack(side="left", ipady=4, padx=(0, 10))
+            entry.bind("<Return>", lambda event: self.search_history(history_text))
+            return entry
+        
+        filter_label("Cible (* = préfixe):")
+        self.history_target_entry = filter_entry(18)
+        filter_label("Type:")
+        self.history_type_var = tk.StringVar(value="Tous")
+        ttk.Combobox(filter_frame, textvariable=self.history_type_var, state="readonly", width=20,
+                     values=["Tous"] + self.db.get_scan_types()).pack(side="left", padx=(0, 10))
+        filter_label("Du:")
+        self.history_from_entry = filter_entry(11)
+        filter_label("Au:")
+        self.history_to_entry = filter_entry(11)
+        filter_label("Port ouvert:")
+        self.history_port_entry = filter_entry(6)
+        
+        tk.Button(filter_frame, text="🔍 Rechercher",
+                  command=lambda: self.search_history(history_text),
+                  font=("Segoe UI", 9, "bold"),
+                  bg=self.get_theme_color('accent'), fg="white",
+                  bd=0, relief="flat", cursor="hand2").pack(side="left")
+        
+        # Page navigation
+        page_frame = tk.Frame(history_window, bg=self.get_theme_color('bg'))
+        page_frame.pack(side="bottom", fill="x", padx=20, pady=(0, 15))
+        
+        self.history_prev_btn = tk.Button(page_frame, text="◀ Précédent",
+                                          command=lambda: self.change_history_page(history_text, -1),
+                                          font=("Segoe UI", 9), bg=self.get_theme_color('button_bg'),
+                                          fg=self.get_theme_color('text'), bd=0, relief="flat", cursor="hand2", width=12)
+        self.history_prev_btn.pack(side="left")
+        
+        self.history_page_label = tk.Label(page_frame, text="", font=("Segoe UI", 9),
+                                           bg=self.get_theme_color('bg'), fg=self.get_theme_color('text_muted'))
+        self.history_page_label.pack(side="left", expand=True)
+        
+        self.history_next_btn = tk.Button(page_frame, text="Suivant ▶",
+                                          command=lambda: self.change_history_page(history_text, 1),
+                                          font=("Segoe UI", 9), bg=self.get_theme_color('button_bg'),
+                                          fg=self.get_theme_color('text'), bd=0, relief="flat", cursor="hand2", width=12)
+        self.history_next_btn.pack(side="right")
+        
         # History display with improved formatting
         list_frame = tk.Frame(history_window, bg=self.get_theme_color('bg'))
         list_frame.pack(fill="both", expand=True, padx=20, pady=10)
@@ -981,14 +1462,54 @@ class CyberScannerPRO:
         history_text.pack(fill="both", expand=True)
         scrollbar.config(command=history_text.yview)
         
-        # Load and display formatted history
+        # Load and display the first page
+        self.history_filters = {}
+        self.history_pages = [None]
         self.load_formatted_history(history_text)
         
         # Store reference for refresh
         self.history_text_widget = history_text
     
+    def search_history(self, text_widget):
+        """Apply the history filters and go back to the first page"""
+        filters = {}
+        target = self.history_target_entry.get().strip()
+        if target:
+            filters['target'] = target
+        if self.history_type_var.get() != "Tous":
+            filters['scan_type'] = self.history_type_var.get()
+        try:
+            for key, entry in (('date_from', self.history_from_entry), ('date_to', self.history_to_entry)):
+                value = entry.get().strip()
+                if value:
+                    # strptime accepts 2024-1-5, the database expects 2024-01-05
+                    filters[key] = datetime.strptime(value, "%Y-%m-%d").date().isoformat()
+        except ValueError:
+            messagebox.showerror("Erreur", "Format de date non valide (AAAA-MM-JJ)")
+            return
+        port = self.history_port_entry.get().strip()
+        if port:
+            if not port.isdigit() or not 0 < int(port) < 65536:
+                messagebox.showerror("Erreur", "Numéro de port non valide")
+                return
+            filters['open_port'] = int(port)
+        
+        self.history_filters = filters
+        self.history_pages = [None]
+        self.load_formatted_history(text_widget)
+    
+    def change_history_page(self, text_widget, step):
+        """Show the next (step=1) or previous (step=-1) history page"""
+        if step < 0 and len(self.history_pages) > 1:
+            self.history_pages.pop()
+        elif step > 0 and self.history_next_key is not None:
+            self.history_pages.append(self.history_next_key)
+        else:
+            return
+        self.load_formatted_history(text_widget)
+    
     def load_formatted_history(self, text_widget):
-        """Load and format scan history"""
+        """Load and format the current page of scan history"""
         try:
             # Clear existing content
             text_widget.delete(1.0, tk.END)
@@ -997,16 +1518,27 @@ class CyberScannerPRO:
             text_widget.insert(tk.END, "CYBER SCANNER PRO - HISTORIQUE DES ANALYSES\n")
             text_widget.insert(tk.END, "=" * 80 + "\n\n")
             
-            # Charger l'historique depuis la base de données
-            history = self.db.get_scan_history(100)
+            # Keyset pagination: history_pages holds the (timestamp, id) key
+            # each page starts after; one extra row tells if a next page exists
+            page = len(self.history_pages)
+            history = self.db.get_scan_page(HISTORY_PAGE_SIZE + 1, after=self.history_pages[-1],
+                                            **self.history_filters)
+            has_next = len(history) > HISTORY_PAGE_SIZE
+            history = history[:HISTORY_PAGE_SIZE]
+            self.history_next_key = (history[-1]['timestamp'], history[-1]['id']) if has_next else None
+            self.history_page_label.config(text=f"Page {page}")
+            self.history_prev_btn.config(state="normal" if page > 1 else "disabled")
+            self.history_next_btn.config(state="normal" if has_next else "disabled")
             
             if not history:
+                if self.history_filters:
+                    text_widget.insert(tk.END, "🔍 Aucune analyse ne correspond aux filtres.\n")
+                    return
                 text_widget.insert(tk.END, "📭 Aucune analyse dans l'historique.\n")
                 text_widget.insert(tk.END, "💡 Effectuez votre première analyse pour voir les résultats ici!\n")
                 return
             
             # Group scans by date
-            from datetime import datetime
             current_date = ""
             scan_count = 0
             
@@ -1080,7 +1612,7 @@ class CyberScannerPRO:
             
             # Résumé
             text_widget.insert(tk.END, "=" * 80 + "\n")
-            text_widget.insert(tk.END, f"📈 Total des analyses affichées: {scan_count}\n")
+            text_widget.insert(tk.END, f"📈 Analyses affichées: {scan_count} (page {page})\n")
             text_widget.insert(tk.END, f"🕒 Dernière mise à jour: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
             
         except Exception as e:
@@ -1099,6 +1631,7 @@ class CyberScannerPRO:
                               "Cette action est définitive et irréversible!"):
             try:
                 if self.db.clear_history():
+                    self.history_pages = [None]
                     self.load_formatted_history(text_widget)
                     messagebox.showinfo("Suppression Réussie", "✅ Historique des analyses supprimé avec succès!")
                 else:
@@ -0,0 +1,160 @@
+"""
+Output view module
+Bounded scan output: the lines live in a ring buffer and a Text widget
+only ever holds the rows that fit on screen, so the GUI keeps constant
+memory and stays responsive however many lines a scan produces
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from collections import deque
+
+# Lines kept in memory; older ones are dropped
+OUTPUT_MAX_LINES = 100_000
+
+FILTER_ALL = "Tout"
+FILTER_OPEN = "Ports ouverts"
+
+class OutputLog:
+    """
+    Ring buffer of output lines.
+    Every line gets an absolute sequence number; `first` is the number
+    of the oldest line still held. A line may carry the service of an
+    open port, which the filters use.
+    """
+
+    def __init__(self, max_lines=OUTPUT_MAX_LINES):
+        self.lines = deque(maxlen=max_lines)
+        self.first = 0
+        self.open_only = False
+        self.service = ""
+        # Sequence numbers of the lines matching the filter (None: no filter)
+        self.matches = None
+
+    def __len__(self):
+        return len(self.matches) if self.matches is not None else len(self.lines)
+
+    def _accepts(self, service):
+        if self.open_only and service is None:
+            return False
+        if self.service and (service is None or self.service not in service.lower()):
+            return False
+        return True
+
+    def append(self, lines):
+        """Add (text, service) lines, dropping the oldest beyond the limit"""
+        buffer = self.lines
+        for text, service in lines:
+            if len(buffer) == buffer.maxlen:
+                self.first += 1
+            buffer.append((text, service))
+            if self.matches is not None and self._accepts(service):
+                self.matches.append(self.first + len(buffer) - 1)
+        if self.matches is not None:
+            while self.matches and self.matches[0] < self.first:
+                self.matches.popleft()
+
+    def clear(self):
+        self.first += len(self.lines)
+        self.lines.clear()
+        if self.matches is not None:
+            self.matches.clear()
+
+    def set_filter(self, open_only=False, service=""):
+        """Show only open port lines and/or the lines of a service (substring)"""
+        self.open_only = open_only
+        self.service = service.strip().lower()
+        if not open_only and not self.service:
+            self.matches = None
+            return
+        first = self.first
+        self.matches = deque(first + i for i, (_, service) in enumerate(self.lines)
+                             if self._accepts(service))
+
+    def window(self, start, count):
+        """Texts of `count` shown lines from shown position `start`"""
+        if self.matches is None:
+            return [self.lines[i][0] for i in range(start, min(start + count, len(self.lines)))]
+        first = self.first
+        return [self.lines[self.matches[i] - first][0]
+                for i in range(start, min(start + count, len(self.matches)))]
+
+    def text(self):
+        """All the lines held, unfiltered"""
+        return "\n".join(text for text, _ in self.lines)
+
+class VirtualOutput(tk.Frame):
+    """
+    Read-only output area over an OutputLog.
+    The Text widget is refilled with the visible window on every scroll
+    or resize; it follows new lines while scrolled to the bottom.
+    """
+
+    def __init__(self, parent, log, **text_options):
+        super().__init__(parent, bg=text_options.get("bg"))
+        self.log = log
+        self.top = 0
+        self.follow = True
+        self.text = tk.Text(self, wrap=tk.NONE, state="disabled", **text_options)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.text.pack(side="left", fill="both", expand=True)
+        self.text.bind("<Configure>", lambda event: self.render())
+        self.text.bind("<MouseWheel>", self.on_wheel)
+        self.text.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.text.bind("<Button-5>", lambda event: self.scroll(3))
+        for key, delta in (("<Prior>", -1), ("<Next>", 1)):
+            self.text.bind(key, lambda event, d=delta: self.scroll(d * self.rows()) or "break")
+
+    def rows(self):
+        """Number of lines the Text widget can show"""
+        line_height = self.text.tk.call("font", "metrics", self.text.cget("font"), "-linespace")
+        padding = 2 * int(self.text.cget("pady"))
+        return max(1, (self.text.winfo_height() - padding) // int(line_height))
+
+    def render(self):
+        total = len(self.log)
+        rows = self.rows()
+        last = max(0, total - rows)
+        self.top = last if self.follow else min(self.top, last)
+        self.text.config(state="normal")
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(self.log.window(self.top, rows)))
+        self.text.config(state="disabled")
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, delta):
+        last = max(0, len(self.log) - self.rows())
+        self.top = min(max(0, self.top + delta), last)
+        self.follow = self.top >= last
+        self.render()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.top = int(float(amount) * len(self.log))
+            self.scroll(0)
+        elif action == "scroll":
+            step = self.rows() if unit == "pages" else 1
+            self.scroll(int(amount) * step)
+
+    def on_wheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def append(self, lines):
+        self.log.append(lines)
+        self.render()
+
+    def clear(self):
+        self.log.clear()
+        self.top = 0
+        self.follow = True
+        self.render()
+
+    def set_filter(self, open_only=False, service=""):
+        self.log.set_filter(open_only, service)
+        self.follow = True
+        self.render()